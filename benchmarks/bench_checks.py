@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+RESULT_MARK = "BENCH_RESULT "
+
+DEFAULT_TICKERS = "5,50,500"
+DEFAULT_TEXTS = "1000,10000,100000"
+
+
+def peak_rss_bytes():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_single(n_tickers, n_texts, backend, cycles, latency, alerts, sampling=False, dedup=False):
+    from benchmarks.standins import (
+        KeywordBackend, ReplayReddit, ReplayTwitter, build_corpus, serve_coingecko, serve_discord
+    )
+
+    coins, reddit_items, tweets = build_corpus(n_tickers, n_texts)
+    coingecko = serve_coingecko(coins, latency)
+    discord = serve_discord(latency)
+
+    os.environ["COINGECKO_API_URL"] = coingecko.url
+    os.environ["DISCORD_WEBHOOK_URL"] = f"{discord.url}/api/webhooks/bench"
+    os.environ.setdefault("TWITTER_BEARER_TOKEN", "bench")
+    for key in ("REDDIT_CLIENT_ID", "REDDIT_CLIENT_SECRET", "REDDIT_USER_AGENT"):
+        os.environ.setdefault(key, "bench")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        th = 0.0 if alerts else 1e9
+        cfg = {
+            "tickers": [c["id"] for c in coins],
+            "thresholds": {"pct": th, "sentiment": th},
+            "subreddits": ["CryptoCurrency"],
+            "fetch": {"reddit_limit": len(reddit_items)},
+            "prices": {"rate_per_minute": 60000, "cache_ttl": 0},
+            # the corpus replays a few recorded texts, so dedup would fold most of it into
+            # a few hundred clusters and the run would no longer measure the rest of the pipeline
+            "dedup": {"enabled": dedup},
+        }
+        if backend != "keyword":
+            cfg["inference"] = {"backend": backend}
+        if sampling:
+            cfg["sampling"] = {"enabled": True}
+        (base / "config.json").write_text(json.dumps(cfg), encoding="utf-8")
+        (base / "coins_cache.json").write_text(json.dumps(coins), encoding="utf-8")
+
+        import_start = time.perf_counter()
+        from crypto_shark import logic as logic_mod
+        import_s = time.perf_counter() - import_start
+
+        init_start = time.perf_counter()
+        logic = logic_mod.CryptoWatcherLogic(base_dir=base)
+        init_s = time.perf_counter() - init_start
+
+        replay = ReplayReddit(reddit_items, latency)
+        logic.reddit = replay
+        logic._make_reddit = lambda: replay
+        logic.twitter = ReplayTwitter(tweets, latency)
+        if backend == "keyword":
+            logic._pipeline = KeywordBackend()
+
+        load_start = time.perf_counter()
+        logic.load_pipeline()
+        model_load_s = time.perf_counter() - load_start
+
+        runs = []
+        for cycle in range(cycles):
+            start = time.perf_counter()
+            messages = logic.run_checks()
+            wall = time.perf_counter() - start
+            stages = logic.metrics.stage_totals()
+            counters = logic.metrics.counters
+            inference_s = stages.get("inference", {}).get("seconds", 0.0)
+            runs.append({
+                "cycle": cycle,
+                "wall_seconds": round(wall, 6),
+                "texts_per_sec": round(n_texts / wall, 1) if cycle == 0 and wall else None,
+                "classified": counters["texts_classified"],
+                "classified_per_sec": round(counters["texts_classified"] / inference_s, 1)
+                if inference_s else None,
+                "cache_hit_rate": round(logic.sentiment_cache.hit_rate(), 4),
+                "counters": dict(counters),
+                "stages": {k: {"seconds": round(v["seconds"], 6), "calls": v["calls"]}
+                           for k, v in stages.items()},
+                "errors": [m for m in messages if m.startswith("Error")],
+            })
+        logic.close()
+
+    coingecko.close()
+    discord.close()
+    return {
+        "tickers": n_tickers,
+        "texts": n_texts,
+        "backend": backend,
+        "sampling": sampling,
+        "dedup": dedup,
+        "import_seconds": round(import_s, 6),
+        "init_seconds": round(init_s, 6),
+        "model_load_seconds": round(model_load_s, 6),
+        "cycles": runs,
+        "coingecko_requests": coingecko.requests,
+        "discord_requests": discord.requests,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_grid(args):
+    results = []
+    for n_tickers in [int(x) for x in args.tickers.split(",")]:
+        for n_texts in [int(x) for x in args.texts.split(",")]:
+            # each scale runs in its own process so peak RSS is not shared between scales
+            cmd = [
+                sys.executable, "-m", "benchmarks.bench_checks", "--single",
+                "--tickers", str(n_tickers), "--texts", str(n_texts),
+                "--backend", args.backend, "--cycles", str(args.cycles),
+                "--latency-ms", str(args.latency_ms),
+            ]
+            if not args.alerts:
+                cmd.append("--no-alerts")
+            if args.sampling:
+                cmd.append("--sampling")
+            if args.dedup:
+                cmd.append("--dedup")
+            proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_MARK)]
+            if proc.returncode or not lines:
+                print(f"{n_tickers:>5} tickers {n_texts:>7} texts  FAILED\n{proc.stderr}")
+                continue
+            res = json.loads(lines[-1][len(RESULT_MARK):])
+            first = res["cycles"][0]
+            print(
+                f"{n_tickers:>5} tickers {n_texts:>7} texts  "
+                f"{first['wall_seconds']:8.3f}s  {first['texts_per_sec'] or 0:>10,.0f} texts/s  "
+                f"peak {res['peak_rss_bytes'] / 2**20:7.1f} MiB"
+            )
+            results.append(res)
+    return results
+
+
+def compare(old_path, new_path):
+    old = {(r["tickers"], r["texts"]): r for r in json.loads(Path(old_path).read_text())["runs"]}
+    new = json.loads(Path(new_path).read_text())["runs"]
+    for r in new:
+        o = old.get((r["tickers"], r["texts"]))
+        if not o:
+            continue
+        ow, nw = o["cycles"][0]["wall_seconds"], r["cycles"][0]["wall_seconds"]
+        orss, nrss = o["peak_rss_bytes"], r["peak_rss_bytes"]
+        print(
+            f"{r['tickers']:>5} tickers {r['texts']:>7} texts  "
+            f"wall {ow:8.3f}s -> {nw:8.3f}s ({(nw - ow) / ow:+.1%})  "
+            f"rss {(nrss - orss) / orss:+.1%}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_checks")
+    parser.add_argument("--tickers", default=DEFAULT_TICKERS, help="comma-separated ticker counts")
+    parser.add_argument("--texts", default=DEFAULT_TEXTS, help="comma-separated text counts")
+    parser.add_argument("--backend", default="keyword", choices=["keyword", "torch", "onnx"],
+                        help="keyword skips the model to isolate the rest of the pipeline")
+    parser.add_argument("--cycles", type=int, default=2, help="cycles per scale (later ones are incremental)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated network latency")
+    parser.add_argument("--no-alerts", dest="alerts", action="store_false")
+    parser.add_argument("--sampling", action="store_true", help="enable the adaptive sampling budget")
+    parser.add_argument("--dedup", action="store_true", help="enable near-duplicate collapsing")
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    if args.single:
+        res = run_single(int(args.tickers), int(args.texts), args.backend,
+                         args.cycles, args.latency_ms / 1000, args.alerts, args.sampling,
+                         args.dedup)
+        print(RESULT_MARK + json.dumps(res))
+        return 0
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("single", "compare", "out")},
+        "runs": run_grid(args),
+    }
+    out = args.out or RESULTS_DIR / f"{datetime.utcnow():%Y%m%d-%H%M%S}-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
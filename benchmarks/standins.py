@@ -0,0 +1,181 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_fixture(name):
+    return json.loads((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+def build_corpus(n_tickers, n_texts, seed=16):
+    markets = load_fixture("coingecko_markets.json")
+    comments = load_fixture("reddit_comments.json")
+    tweets = load_fixture("tweets.json")
+    rnd = random.Random(seed)
+
+    coins = []
+    for k in range(n_tickers):
+        base = markets[k % len(markets)]
+        copy = k // len(markets)
+        if not copy:
+            coins.append(dict(base))
+            continue
+        coins.append({
+            **base,
+            "id": f"{base['id']}-{copy}",
+            "symbol": f"{base['symbol']}{copy}",
+            "name": f"{base['name']} {copy}",
+            "current_price": round(base["current_price"] * (1 + copy / 100), 6),
+        })
+
+    # recorded texts are replayed with a watched coin mention and a counter so every
+    # text is unique and the sentiment cache does not hide the inference cost
+    n_tweets = min(100, n_texts // 10)
+    n_comments = n_texts - n_tweets
+    start = comments[0]["created_utc"]
+    reddit = [
+        SimpleNamespace(
+            id=f"b{i:x}",
+            fullname=f"t1_b{i:x}",
+            created_utc=start - i,
+            body=f"{rnd.choice(comments)['body']} ${rnd.choice(coins)['symbol'].upper()} #{i}"
+        )
+        for i in range(n_comments)
+    ]
+    first_id = int(tweets[0]["id"])
+    twitter = [
+        SimpleNamespace(
+            id=str(first_id + n_tweets - i),
+            text=f"{rnd.choice(tweets)['text']} #{rnd.choice(coins)['id']} {i}",
+            lang="en"
+        )
+        for i in range(n_tweets)
+    ]
+    return coins, reddit, twitter
+
+
+class ReplaySubreddit:
+    def __init__(self, comments, latency=0.0):
+        self._comments = comments
+        self._latency = latency
+
+    def comments(self, limit=None):
+        # PRAW pages 100 comments per request
+        for i, c in enumerate(self._comments[:limit]):
+            if i % 100 == 0 and self._latency:
+                time.sleep(self._latency)
+            yield c
+
+
+class ReplayReddit:
+    def __init__(self, comments, latency=0.0):
+        self._comments = comments
+        self._latency = latency
+
+    def subreddit(self, name):
+        return ReplaySubreddit(self._comments, self._latency)
+
+
+class ReplayTwitter:
+    def __init__(self, tweets, latency=0.0):
+        self._tweets = tweets
+        self._latency = latency
+
+    def search_recent_tweets(self, query, tweet_fields=None, max_results=10, since_id=None):
+        if self._latency:
+            time.sleep(self._latency)
+        data = [t for t in self._tweets if since_id is None or int(t.id) > int(since_id)]
+        data = data[:max_results]
+        meta = {"newest_id": data[0].id, "result_count": len(data)} if data else {"result_count": 0}
+        return SimpleNamespace(data=data or None, meta=meta)
+
+
+class _StandInServer:
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.requests = 0
+        handler.owner = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    owner = None
+    latency = 0.0
+
+    def _reply(self, code, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(code)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve_coingecko(coins, latency=0.0):
+    by_id = {c["id"]: c for c in coins}
+
+    class CoinGeckoHandler(_Handler):
+        def do_GET(self):
+            self.owner.requests += 1
+            if latency:
+                time.sleep(latency)
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path.endswith("/simple/price"):
+                ids = [i for i in q.get("ids", "").split(",") if i in by_id]
+                self._reply(200, {i: {"usd": by_id[i]["current_price"]} for i in ids})
+            elif url.path.endswith("/coins/markets"):
+                per_page = int(q.get("per_page", 100))
+                page = int(q.get("page", 1))
+                self._reply(200, coins[(page - 1) * per_page:page * per_page])
+            else:
+                self._reply(404, {"error": "not found"})
+
+    return _StandInServer(CoinGeckoHandler)
+
+
+def serve_discord(latency=0.0):
+    class DiscordHandler(_Handler):
+        def do_POST(self):
+            self.owner.requests += 1
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if latency:
+                time.sleep(latency)
+            self._reply(204)
+
+    return _StandInServer(DiscordHandler)
+
+
+class KeywordBackend:
+    name = "keyword"
+    NEGATIVE = ("down", "rug", "liquidat", "hack", "terrible", "rigged", "outage", "dump",
+                "brutal", "tired", "toxic", "halt", "mess", "heavy", "bleeding", "freeze")
+
+    def __call__(self, texts):
+        out = []
+        for t in texts:
+            low = t.lower()
+            neg = any(w in low for w in self.NEGATIVE)
+            out.append({"label": "NEGATIVE" if neg else "POSITIVE", "score": 0.9})
+        return out
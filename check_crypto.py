@@ -1,5 +1,17 @@
+import sys
+
 from crypto_shark.logic import CryptoWatcherLogic
+from crypto_shark.metrics import StartupProfile
 
 if __name__ == "__main__":
+    profile = StartupProfile("check") if "--profile-startup" in sys.argv[1:] else None
     logic = CryptoWatcherLogic()
-    logic.run_checks()
+    if profile:
+        profile.mark("CryptoWatcherLogic()")
+    try:
+        logic.run_checks()
+    finally:
+        logic.close()
+    if profile:
+        profile.mark("first check done")
+        print(profile.report("crypto_shark.logic"))
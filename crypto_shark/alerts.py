@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import requests
+
+from crypto_shark.prices import retry_after_seconds
+from crypto_shark.statestore import lock_path, locked, try_hold, write_atomic
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SPOOL_FILE = BASE_DIR / "alerts_spool.jsonl"
+
+BATCH_SIZE = 10  # Discord accepts at most 10 embeds per webhook message
+MAX_BACKOFF = 60
+USERNAME = "CryptoWatcherBot"
+
+
+def _read_spool(path: Path):
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    out = []
+    for line in lines:
+        try:
+            rec = json.loads(line)
+            out.append((rec["id"], rec["embed"]))
+        except (ValueError, KeyError, TypeError):
+            # a crash mid-append leaves at most one torn line behind
+            continue
+    return out
+
+
+def webhook_spool(path: Path, url):
+    # each extra webhook spools next to the default spool, under a digest of its URL
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+    return path.with_name(f"{path.stem}.{digest}{path.suffix}")
+
+
+def stranded_alerts(path: Path, urls):
+    # a webhook removed from or changed in config leaves its spools behind, and no dispatcher
+    # claims them; counts their undelivered alerts per webhook, as a glob of its spool files
+    keep = {webhook_spool(path, url).name for url in urls}
+    name = re.compile(rf"({re.escape(path.stem)}\.[0-9a-f]{{8}})(?:\.p\d+-[0-9a-f]{{6}})?{re.escape(path.suffix)}")
+    out = {}
+    for f in sorted(path.parent.glob(f"{path.stem}.*{path.suffix}")):
+        m = name.fullmatch(f.name)
+        if not m or m[1] + path.suffix in keep:
+            continue
+        lease = try_hold(f)
+        if lease is None:
+            # a running process with another config still delivers these
+            continue
+        try:
+            n = len(_read_spool(f))
+        finally:
+            lease.close()
+        if n:
+            pattern = f"{m[1]}*{path.suffix}"
+            out[pattern] = out.get(pattern, 0) + n
+    return out
+
+
+class AlertSpool:
+    def __init__(self, path: Path = SPOOL_FILE):
+        # every process appends to its own file and holds a lease on it while it runs, so
+        # cron, the daemon and the GUI never resend or rewrite each other's pending alerts
+        self.base = path
+        self.path = path.with_name(f"{path.stem}.p{os.getpid()}-{uuid.uuid4().hex[:6]}{path.suffix}")
+        self._lease = try_hold(self.path)
+        self._lock = threading.Lock()
+        self.pending = OrderedDict(self._claim())
+        if self.pending:
+            self._rewrite()
+
+    def _claim(self):
+        # spools left by processes that are gone (crashed, or closed with alerts undelivered);
+        # a file whose lease is still held belongs to a running process and is left alone
+        claimed = []
+        with locked(self.base):
+            for other in [self.base, *sorted(self.base.parent.glob(f"{self.base.stem}.p*{self.base.suffix}"))]:
+                if other == self.path or not other.exists():
+                    continue
+                if other == self.base:
+                    # written by versions before per-process spools; nobody holds a lease on it
+                    claimed += _read_spool(other)
+                    other.unlink(missing_ok=True)
+                    continue
+                lease = try_hold(other)
+                if lease is None:
+                    continue
+                try:
+                    claimed += _read_spool(other)
+                    other.unlink(missing_ok=True)
+                finally:
+                    lease.close()
+                lock_path(other).unlink(missing_ok=True)
+        return claimed
+
+    def _rewrite(self):
+        if not self.pending:
+            self.path.unlink(missing_ok=True)
+            return
+        write_atomic(self.path, "".join(
+            json.dumps({"id": a, "embed": e}, separators=(",", ":")) + "\n"
+            for a, e in self.pending.items()
+        ))
+
+    def add(self, embed):
+        aid = uuid.uuid4().hex
+        line = json.dumps({"id": aid, "embed": embed}, separators=(",", ":"))
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending[aid] = embed
+        return aid
+
+    def done(self, ids):
+        with self._lock:
+            for aid in ids:
+                self.pending.pop(aid, None)
+            self._rewrite()
+
+    def close(self):
+        # undelivered alerts stay on disk; releasing the lease lets the next process claim them
+        with self._lock:
+            if self._lease is None:
+                return
+            self._lease.close()
+            self._lease = None
+            if not self.pending:
+                self.path.unlink(missing_ok=True)
+                lock_path(self.path).unlink(missing_ok=True)
+
+
+class AlertDispatcher:
+    def __init__(self, webhook_url, spool_path: Path = SPOOL_FILE, batch_size=BATCH_SIZE,
+                 max_backoff=MAX_BACKOFF, on_retry=None):
+        self.webhook_url = webhook_url
+        self.batch_size = max(1, min(batch_size, BATCH_SIZE))
+        self.max_backoff = max_backoff
+        self.on_retry = on_retry or (lambda: None)
+        self.session = requests.Session()
+        self.spool = AlertSpool(spool_path)
+        self.delivered = 0
+        self.dropped = 0
+
+        self._queue = deque(self.spool.pending.items())
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="crypto-alerts", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, webhook_url, cfg, spool_path: Path = SPOOL_FILE, on_retry=None):
+        return cls(
+            webhook_url,
+            spool_path,
+            batch_size=cfg.get("batch_size", BATCH_SIZE),
+            max_backoff=cfg.get("max_backoff", MAX_BACKOFF),
+            on_retry=on_retry
+        )
+
+    def send(self, embed):
+        # spooled before it is queued, so an alert survives a crash before delivery
+        aid = self.spool.add(embed)
+        with self._cond:
+            self._queue.append((aid, embed))
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def close(self, timeout=10):
+        # whatever is still undelivered stays in the spool for the next start
+        flushed = self.flush(timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(1)
+        self.spool.close()
+        return flushed
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+
+            ok = self._deliver([embed for _, embed in batch])
+            if ok is not None:
+                self.spool.done([aid for aid, _ in batch])
+                if ok:
+                    self.delivered += len(batch)
+                else:
+                    self.dropped += len(batch)
+            with self._cond:
+                if ok is None:
+                    self._queue.extendleft(reversed(batch))
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _wait(self, seconds):
+        return not self._stop.wait(max(seconds, 0))
+
+    def _deliver(self, embeds):
+        payload = {"username": USERNAME, "embeds": embeds}
+        attempt = 0
+        while True:
+            if not self._wait(self._blocked_until - time.monotonic()):
+                return None
+            try:
+                resp = self.session.post(self.webhook_url, json=payload, timeout=10)
+            except requests.RequestException as e:
+                print(f"Discord error: {e} – retrying")
+                resp = None
+
+            if resp is not None and resp.status_code == 429:
+                try:
+                    wait = float(resp.json()["retry_after"])
+                except (ValueError, KeyError, TypeError):
+                    wait = retry_after_seconds(resp.headers.get("Retry-After"), default=5.0)
+                self._blocked_until = time.monotonic() + wait
+                self.on_retry()
+                continue
+
+            if resp is None or resp.status_code >= 500:
+                self.on_retry()
+                if not self._wait(min(2 ** attempt, self.max_backoff)):
+                    return None
+                attempt += 1
+                continue
+
+            if not resp.ok:
+                # malformed payload or revoked webhook: retrying would only repeat it
+                print(f"Discord rejected alert batch: HTTP {resp.status_code}")
+                return False
+
+            if resp.headers.get("X-RateLimit-Remaining") == "0":
+                self._blocked_until = time.monotonic() + retry_after_seconds(
+                    resp.headers.get("X-RateLimit-Reset-After"), default=1.0
+                )
+            return True
@@ -0,0 +1,393 @@
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from crypto_shark.history import window_seconds
+from crypto_shark.logstore import LOG_DB, LEGACY_LOG, parse_legacy_line
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG = BASE_DIR / "config.json"
+
+DEFAULT_HORIZON = "1h"
+DEFAULT_PCT_GRID = (0.0, 10.0, 100)
+DEFAULT_SENT_GRID = (0.0, 1.0, 100)
+DEFAULT_MIN_ALERTS = 5
+
+
+class History:
+    def __init__(self, coins, coin_idx, ts, price, neg):
+        self.coins = coins
+        self.coin_idx = coin_idx
+        self.ts = ts
+        self.price = price
+        self.neg = neg
+
+    def __len__(self):
+        return len(self.ts)
+
+    @classmethod
+    def from_rows(cls, coins, ts, price, neg):
+        coin_names = sorted(set(coins))
+        index = {c: i for i, c in enumerate(coin_names)}
+        coin_idx = np.fromiter((index[c] for c in coins), dtype=np.int64, count=len(coins))
+        # ISO timestamps parse in one call as datetime64, then become float seconds
+        ts = np.asarray(ts).astype("datetime64[us]").astype(np.int64) / 1e6
+        price = np.asarray(price, dtype=np.float64)
+        neg = np.asarray(neg, dtype=np.float64)
+        order = np.lexsort((ts, coin_idx))
+        return cls(coin_names, coin_idx[order], ts[order], price[order], neg[order])
+
+    @classmethod
+    def from_db(cls, path: Path = LOG_DB, coins=None, since=None, until=None):
+        clauses, args = ["price IS NOT NULL", "neg IS NOT NULL"], []
+        if coins:
+            clauses.append(f"coin IN ({','.join('?' * len(coins))})")
+            args += list(coins)
+        if since:
+            clauses.append("ts >= ?")
+            args.append(since)
+        if until:
+            clauses.append("ts < ?")
+            args.append(until)
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                f"SELECT coin, ts, price, neg FROM checks WHERE {' AND '.join(clauses)}", args
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return cls.from_rows([], [], [], [])
+        # one object array instead of zip(*rows): millions of rows split into columns much faster
+        cols = np.array(rows, dtype=object)
+        return cls.from_rows(cols[:, 0], cols[:, 1], cols[:, 2], cols[:, 3])
+
+    @classmethod
+    def from_legacy(cls, path: Path = LEGACY_LOG):
+        rows = []
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if rec := parse_legacy_line(line):
+                    rows.append((rec[1], rec[0], rec[2], rec[5]))
+        if not rows:
+            return cls.from_rows([], [], [], [])
+        return cls.from_rows(*zip(*rows))
+
+    def features(self, horizon):
+        same_prev = np.zeros(len(self), dtype=bool)
+        same_prev[1:] = self.coin_idx[1:] == self.coin_idx[:-1]
+        prev = np.roll(self.price, 1)
+        # the rule compares each check with the previous check of the same coin
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pct = np.where(same_prev & (prev > 0), (self.price - prev) / prev * 100, np.nan)
+
+        # forward move: first check of the same coin at least `horizon` seconds later;
+        # rows are sorted by (coin, ts), so one searchsorted covers every coin at once
+        t0 = self.ts.min()
+        span = self.ts.max() - t0 + horizon + 1
+        key = self.coin_idx * span + (self.ts - t0)
+        j = np.searchsorted(key, key + horizon)
+        valid = j < len(self)
+        j = np.minimum(j, len(self) - 1)
+        valid &= self.coin_idx[j] == self.coin_idx
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fwd = np.where(valid, (self.price[j] - self.price) / self.price * 100, np.nan)
+        return pct, fwd
+
+
+    def window_stats(self, spec):
+        # the per-window stats live checks read from history.npy, for every logged check:
+        # each row looks back over the same coin's checks in [ts - window, ts]
+        seconds = window_seconds(spec)
+        idx = np.arange(len(self))
+        t0 = self.ts.min()
+        span = self.ts.max() - t0 + seconds + 1
+        key = self.coin_idx * span + (self.ts - t0)
+        start = np.searchsorted(key, key - seconds, side="left")
+        # like the live ring, a window reaching back before the coin's first check has no stats
+        first = np.searchsorted(key, self.coin_idx * span, side="left")
+        n = np.where(self.ts[first] <= self.ts - seconds, idx - start + 1, 0)
+
+        # windowed sums come from prefix sums, so every row costs O(1)
+        logp = np.log(np.where(self.price > 0, self.price, 1.0))
+        rets = np.diff(logp, prepend=logp[:1])
+        r1 = np.concatenate([[0.0], np.cumsum(rets)])
+        r2 = np.concatenate([[0.0], np.cumsum(rets * rets)])
+        n1 = np.concatenate([[0.0], np.cumsum(self.neg)])
+        n2 = np.concatenate([[0.0], np.cumsum(self.neg * self.neg)])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ref = self.price[start]
+            pct = np.where(n >= 2, (self.price - ref) / ref * 100, np.nan)
+
+            m = idx - start
+            mean_r = (r1[idx + 1] - r1[start + 1]) / m
+            var_r = (r2[idx + 1] - r2[start + 1]) / m - mean_r ** 2
+            vol = np.where(n >= 3, np.sqrt(np.maximum(var_r, 0.0)), np.nan)
+
+            mean = (n1[idx + 1] - n1[start]) / n
+            std = np.sqrt(np.maximum((n2[idx + 1] - n2[start]) / n - mean ** 2, 0.0))
+            z = np.where((n >= 3) & (std > 1e-12), (self.neg - mean) / std, np.nan)
+        return pct, vol, z
+
+    def window_fires(self, rules):
+        # mirrors history.window_rule_hits: a window fires when every condition it lists holds
+        fire = np.zeros(len(self), dtype=bool)
+        direction = np.zeros(len(self))
+        for w, rule in (rules or {}).items():
+            pct, vol, z = self.window_stats(w)
+            checks = []
+            if "pct" in rule:
+                checks.append(np.abs(pct) >= rule["pct"])
+            if "volatility" in rule:
+                checks.append(vol >= rule["volatility"])
+            if "sentiment_z" in rule:
+                checks.append(z >= rule["sentiment_z"])
+            if "sentiment" in rule:
+                checks.append(self.neg >= rule["sentiment"])
+            if not checks:
+                continue
+            hit = np.logical_and.reduce(checks)
+            # the alert reports the first matching window's move, in config order
+            first = hit & ~fire
+            direction[first] = np.sign(np.nan_to_num(pct[first]))
+            fire |= hit
+        return fire, direction
+
+
+def grid(spec):
+    start, stop, num = spec
+    return np.linspace(float(start), float(stop), int(num))
+
+
+def _bins(values, edges):
+    # index of the largest threshold <= value; -1 means below every threshold
+    return np.searchsorted(edges, values, side="right") - 1
+
+
+def _suffix_sum(a):
+    # cell (i, j) becomes the total over every (>= i, >= j): alerts fire for all lower thresholds
+    return a[..., ::-1, ::-1].cumsum(axis=-2).cumsum(axis=-1)[..., ::-1, ::-1]
+
+
+def evaluate(history: History, pct_grid, sent_grid, horizon=window_seconds(DEFAULT_HORIZON), min_move=0.0,
+             window_rules=None):
+    pct, fwd = history.features(horizon)
+    valid = ~np.isnan(pct) & ~np.isnan(history.neg)
+    move = np.where(valid, np.abs(pct), -1.0)
+    pi = _bins(move, pct_grid)
+    si = _bins(history.neg, sent_grid)
+    ok = valid & (pi >= 0) & (si >= 0)
+
+    # a hit: the price keeps moving the way it moved when the alert fired
+    measured = valid & ~np.isnan(fwd)
+    follow = np.where(measured, np.sign(pct) * fwd, 0.0)
+    hit = measured & (follow > min_move)
+
+    # window rules fire regardless of the base pair; where the base rule fires as well,
+    # the alert reports the base move, as in the live check
+    w_fire, w_dir = history.window_fires(window_rules)
+    w_measured = w_fire & ~np.isnan(fwd)
+    w_follow = np.where(w_measured, w_dir * np.nan_to_num(fwd), 0.0)
+    w_hit = w_measured & (w_follow > min_move)
+
+    n_c, n_p, n_s = len(history.coins), len(pct_grid), len(sent_grid)
+    cell = (history.coin_idx * n_p + pi) * n_s + si
+    size = n_c * n_p * n_s
+
+    def cube(mask, weights=None):
+        w = None if weights is None else weights[mask]
+        counts = np.bincount(cell[mask], weights=w, minlength=size).reshape(n_c, n_p, n_s)
+        return _suffix_sum(counts.astype(np.float64))
+
+    def per_coin(weights):
+        # rows that alert at every threshold pair add the same amount to each cell
+        return np.bincount(history.coin_idx, weights=weights.astype(np.float64), minlength=n_c)[:, None, None]
+
+    base_only = ok & ~w_fire
+    both = ok & w_fire
+    alerts = cube(base_only) + per_coin(w_fire)
+    scored_n = (cube(base_only & measured) + per_coin(w_measured)
+                + cube(both, measured.astype(np.float64) - w_measured))
+    hits = cube(base_only & hit) + per_coin(w_hit) + cube(both, hit.astype(np.float64) - w_hit)
+    follow_sum = cube(base_only & measured, follow) + per_coin(w_follow) + cube(both, follow - w_follow)
+    return {
+        "coins": history.coins,
+        "pct_grid": pct_grid,
+        "sent_grid": sent_grid,
+        "alerts": alerts,
+        "scored": scored_n,
+        "hits": hits,
+        "follow": follow_sum,
+        "rows": (history.coin_idx, move, history.neg, measured, hit, follow),
+        "window_rows": (w_fire, w_measured, w_hit, w_follow),
+        "window_rules": list(window_rules or {}),
+    }
+
+
+def summarize(alerts, scored, hits, follow):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(scored > 0, hits / scored, np.nan)
+        mean_follow = np.where(scored > 0, follow / scored, np.nan)
+    return hit_rate, mean_follow
+
+
+def best_pairs(result, min_alerts=DEFAULT_MIN_ALERTS, top=10, coin=None):
+    if coin is None:
+        parts = [result[k].sum(axis=0) for k in ("alerts", "scored", "hits", "follow")]
+    else:
+        c = result["coins"].index(coin)
+        parts = [result[k][c] for k in ("alerts", "scored", "hits", "follow")]
+    alerts, scored, hits, follow = parts
+    hit_rate, mean_follow = summarize(alerts, scored, hits, follow)
+    rank = np.where((scored >= min_alerts) & ~np.isnan(hit_rate), hit_rate, -1.0)
+    # ties on hit rate prefer more alerts
+    order = np.lexsort((-alerts.ravel(), -rank.ravel()))
+    out = []
+    for flat in order[:top]:
+        i, j = divmod(int(flat), alerts.shape[1])
+        if rank[i, j] < 0:
+            break
+        out.append({
+            "pct": float(result["pct_grid"][i]),
+            "sentiment": float(result["sent_grid"][j]),
+            "alerts": int(alerts[i, j]),
+            "scored": int(scored[i, j]),
+            "hit_rate": float(hit_rate[i, j]),
+            "mean_follow_pct": float(mean_follow[i, j]),
+        })
+    return out
+
+
+def at_threshold(result, pct, sent, coin=None, overrides=None):
+    # exact for any pair, not just grid points: one masked pass over the rows,
+    # with per-coin overrides spread to every row through the coin index
+    coin_idx, move, neg, measured, hit, follow = result["rows"]
+    pct_t = np.full(len(result["coins"]), float(pct))
+    sent_t = np.full(len(result["coins"]), float(sent))
+    for c, o in (overrides or {}).items():
+        if c in result["coins"]:
+            k = result["coins"].index(c)
+            pct_t[k] = o.get("pct", pct)
+            sent_t[k] = o.get("sentiment", sent)
+    base = (move >= pct_t[coin_idx]) & (neg >= sent_t[coin_idx])
+    w_fire, w_measured, w_hit, w_follow = result["window_rows"]
+    fire = base | w_fire
+    measured = np.where(base, measured, w_measured)
+    hit = np.where(base, hit, w_hit)
+    follow = np.where(base, follow, w_follow)
+    if coin is not None:
+        fire &= coin_idx == result["coins"].index(coin)
+    alerts = fire.sum()
+    scored = (fire & measured).sum()
+    hits = (fire & hit).sum()
+    follow = follow[fire & measured].sum()
+    return {
+        "pct": float(pct),
+        "sentiment": float(sent),
+        "alerts": int(alerts),
+        "scored": int(scored),
+        "hit_rate": float(hits / scored) if scored else None,
+        "mean_follow_pct": float(follow / scored) if scored else None,
+    }
+
+
+def _fmt(row):
+    hit = "   n/a" if row["hit_rate"] is None else f"{row['hit_rate']:6.1%}"
+    follow = "    n/a" if row["mean_follow_pct"] is None else f"{row['mean_follow_pct']:+7.2f}%"
+    return (f"pct >= {row['pct']:6.2f}%  neg >= {row['sentiment']:5.1%}  "
+            f"alerts {row['alerts']:7d}  hit {hit}  follow {follow}")
+
+
+def _grid_arg(text):
+    parts = text.split(":")
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError("use START:STOP:COUNT, e.g. 0:10:100")
+    return float(parts[0]), float(parts[1]), int(parts[2])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crypto_shark.backtest")
+    parser.add_argument("--db", type=Path, default=LOG_DB)
+    parser.add_argument("--legacy", type=Path, help="read an old logs.txt instead of logs.db")
+    parser.add_argument("--coins", help="comma-separated coin ids (default: all in the log)")
+    parser.add_argument("--since", help="ISO timestamp, e.g. 2025-01-01")
+    parser.add_argument("--until")
+    parser.add_argument("--horizon", default=DEFAULT_HORIZON, help="forward window for hits (5m, 1h, 24h)")
+    parser.add_argument("--min-move", type=float, default=0.0,
+                        help="%% the price must keep moving in the alert's direction to count as a hit")
+    parser.add_argument("--pct-grid", type=_grid_arg, default=DEFAULT_PCT_GRID, metavar="START:STOP:COUNT")
+    parser.add_argument("--sent-grid", type=_grid_arg, default=DEFAULT_SENT_GRID, metavar="START:STOP:COUNT")
+    parser.add_argument("--min-alerts", type=int, default=DEFAULT_MIN_ALERTS)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--per-coin", action="store_true", help="also report the best pair for every coin")
+    parser.add_argument("--json", type=Path, help="write the full grids and summaries here")
+    args = parser.parse_args(argv)
+
+    coins = [c.strip() for c in args.coins.split(",")] if args.coins else None
+    if args.legacy:
+        history = History.from_legacy(args.legacy)
+    else:
+        history = History.from_db(args.db, coins, args.since, args.until)
+    if not len(history):
+        print("No check history to backtest.")
+        return 1
+
+    try:
+        th = json.loads(CONFIG.read_text(encoding="utf-8")).get("thresholds", {})
+    except (OSError, ValueError):
+        th = {}
+    pct, sent, overrides = th.get("pct", 3.0), th.get("sentiment", 0.6), th.get("coins", {})
+    rules = th.get("windows", {})
+
+    result = evaluate(history, grid(args.pct_grid), grid(args.sent_grid),
+                      window_seconds(args.horizon), args.min_move, rules)
+    print(f"{len(history):,} checks, {len(history.coins)} coins, "
+          f"{len(result['pct_grid'])}x{len(result['sent_grid'])} thresholds, horizon {args.horizon}")
+
+    current = at_threshold(result, pct, sent, overrides=overrides)
+    notes = [f"{len(overrides)} per-coin overrides"] if overrides else []
+    if rules:
+        notes.append(f"window rules {', '.join(rules)}")
+    print("\nCurrent thresholds" + (f" ({'; '.join(notes)}):" if notes else ":"))
+    print("  " + _fmt(current))
+
+    report = {"current": current, "best": best_pairs(result, args.min_alerts, args.top), "coins": {}}
+    held = f", window rules {', '.join(rules)} held fixed" if rules else ""
+    print(f"\nBest pairs (at least {args.min_alerts} scored alerts{held}):")
+    for row in report["best"]:
+        print("  " + _fmt(row))
+
+    if args.per_coin:
+        print("\nPer coin (current, then best):")
+        suggested = {}
+        for coin in history.coins:
+            o = overrides.get(coin, {})
+            now = at_threshold(result, o.get("pct", pct), o.get("sentiment", sent), coin)
+            best = best_pairs(result, args.min_alerts, 1, coin)
+            report["coins"][coin] = {"current": now, "best": best[0] if best else None}
+            print(f"  {coin:<20} " + _fmt(now))
+            print(f"  {'':<20} " + (_fmt(best[0]) if best else "not enough alerts"))
+            if best:
+                suggested[coin] = {"pct": round(best[0]["pct"], 2), "sentiment": round(best[0]["sentiment"], 2)}
+        print("\nSuggested overrides for config.json:")
+        print(json.dumps({"thresholds": {"coins": suggested}}, indent=2))
+
+    if args.json:
+        grids = {k: result[k].tolist() for k in ("alerts", "scored", "hits", "follow")}
+        args.json.write_text(json.dumps({
+            **report,
+            "coin_names": history.coins,
+            "pct_grid": result["pct_grid"].tolist(),
+            "sent_grid": result["sent_grid"].tolist(),
+            "grids": grids,
+        }), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from crypto_shark.statestore import locked, write_atomic
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CACHE_FILE = BASE_DIR / "coins_cache.json"
+
+COINGECKO_API = os.getenv("COINGECKO_API_URL", "https://api.coingecko.com/api/v3")
+
+CACHE_TTL = 3600
+DEFAULT_PAGES = 4
+PER_PAGE = 250
+MARKET_FIELDS = (
+    "id", "symbol", "name", "image", "current_price", "market_cap", "market_cap_rank"
+)
+
+
+class CoinSearchIndex:
+    def __init__(self, coins):
+        self.coins = coins
+        keys = []
+        for idx, coin in enumerate(coins):
+            words = {coin.get("id", ""), coin.get("symbol", "")}
+            name = coin.get("name", "")
+            words.add(name)
+            words.update(name.split())
+            words.update(coin.get("id", "").split("-"))
+            for w in words:
+                if w:
+                    keys.append((w.lower(), idx))
+        keys.sort()
+        self._keys = [k for k, _ in keys]
+        self._ids = [i for _, i in keys]
+        self._symbols = {}
+        for idx, coin in enumerate(coins):
+            self._symbols.setdefault(coin.get("symbol", "").lower(), []).append(idx)
+
+    def search(self, query):
+        query = query.strip().lower()
+        if not query:
+            return list(range(len(self.coins)))
+
+        found = set()
+        pos = bisect_left(self._keys, query)
+        while pos < len(self._keys) and self._keys[pos].startswith(query):
+            found.add(self._ids[pos])
+            pos += 1
+
+        # exact ticker hits first, then the market-cap order the coins came in
+        exact = self._symbols.get(query, [])
+        rest = sorted(found.difference(exact))
+        return exact + rest
+
+
+class CoinStore:
+    def __init__(self, path: Path = CACHE_FILE, pages=DEFAULT_PAGES, per_page=PER_PAGE, ttl=CACHE_TTL):
+        self.path = path
+        self.pages = pages
+        self.per_page = per_page
+        self.ttl = ttl
+        self.session = requests.Session()
+        self.coins = []
+        self.by_id = {}
+        self.by_symbol = {}
+        self.fetched = 0.0
+        self.version = 0
+        self._pages = {}
+        self._mtime = None
+        self._lock = threading.RLock()
+
+    def configure(self, cfg):
+        self.pages = cfg.get("pages", self.pages)
+        self.per_page = cfg.get("per_page", self.per_page)
+        self.ttl = cfg.get("ttl", self.ttl)
+        return self
+
+    def _set_pages(self, pages, fetched):
+        coins, seen = [], set()
+        for page in sorted(pages, key=int):
+            for row in pages[page]["rows"]:
+                coin = dict(zip(MARKET_FIELDS, row))
+                # rankings shift between page requests, so a coin can show up twice
+                if coin["id"] not in seen:
+                    seen.add(coin["id"])
+                    coins.append(coin)
+        by_symbol = {}
+        for coin in coins:
+            by_symbol.setdefault((coin.get("symbol") or "").lower(), []).append(coin)
+
+        self._pages = pages
+        self.coins = coins
+        self.by_id = {c["id"]: c for c in coins}
+        self.by_symbol = by_symbol
+        self.fetched = fetched
+        self.version += 1
+
+    def load(self):
+        with self._lock:
+            try:
+                mtime = self.path.stat().st_mtime
+            except OSError:
+                return self.coins
+            if mtime == self._mtime:
+                return self.coins
+            try:
+                with locked(self.path, shared=True):
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return self.coins
+            self._mtime = mtime
+
+            if isinstance(data, list):
+                # pre-store cache: a pretty-printed list of /coins/markets objects
+                rows = [[c.get(f) for f in MARKET_FIELDS] for c in data if c.get("id")]
+                self._set_pages({"1": {"etag": None, "rows": rows}}, mtime)
+            else:
+                fields = list(data.get("fields", MARKET_FIELDS))
+                pages = {}
+                for page, p in data.get("pages", {}).items():
+                    rows = p["rows"]
+                    if fields != list(MARKET_FIELDS):
+                        rows = [[dict(zip(fields, r)).get(f) for f in MARKET_FIELDS] for r in rows]
+                    pages[page] = {"etag": p.get("etag"), "rows": rows}
+                self._set_pages(pages, data.get("fetched", mtime))
+            return self.coins
+
+    def save(self):
+        with self._lock:
+            data = {"fetched": self.fetched, "fields": MARKET_FIELDS, "pages": self._pages}
+            # the GUI and the checker both refresh this file
+            with locked(self.path):
+                write_atomic(self.path, json.dumps(data, separators=(",", ":")))
+                self._mtime = self.path.stat().st_mtime
+
+    def is_stale(self):
+        return time.time() - self.fetched >= self.ttl
+
+    def _fetch_page(self, page):
+        old = self._pages.get(str(page), {})
+        headers = {"If-None-Match": old["etag"]} if old.get("etag") else {}
+        resp = self.session.get(
+            f"{COINGECKO_API}/coins/markets",
+            params={
+                "vs_currency": "usd",
+                "order": "market_cap_desc",
+                "per_page": self.per_page,
+                "page": page,
+                "sparkline": "false"
+            },
+            headers=headers,
+            timeout=10
+        )
+        if resp.status_code == 304 and old:
+            return old
+        resp.raise_for_status()
+        rows = [[c.get(f) for f in MARKET_FIELDS] for c in resp.json()]
+        return {"etag": resp.headers.get("ETag"), "rows": rows}
+
+    def refresh(self):
+        with ThreadPoolExecutor(max_workers=self.pages) as ex:
+            futures = {str(p): ex.submit(self._fetch_page, p) for p in range(1, self.pages + 1)}
+        pages, errors = {}, []
+        for page, fut in futures.items():
+            try:
+                pages[page] = fut.result()
+            except Exception as e:
+                errors.append(e)
+                if page in self._pages:
+                    pages[page] = self._pages[page]
+        if not pages:
+            raise errors[0]
+        with self._lock:
+            self._set_pages(pages, time.time())
+            self.save()
+        return self.coins
+
+    def get(self, cid, default=None):
+        return self.by_id.get(cid, default)
+
+    def total_market_cap(self):
+        return sum(c.get("market_cap") or 0 for c in self.coins)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def coin_store(path: Path = CACHE_FILE):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = CoinStore(path)
+        return store
@@ -0,0 +1,170 @@
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib import request as urlrequest
+from urllib.error import URLError
+
+from crypto_shark.statestore import read_json
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG = BASE_DIR / "config.json"
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_INTERVAL = 600.0
+
+
+def daemon_settings(path=CONFIG):
+    try:
+        cfg = read_json(path)
+    except (OSError, ValueError):
+        cfg = {}
+    d = cfg.get("daemon", {})
+    return (
+        d.get("host", DEFAULT_HOST),
+        int(d.get("port", DEFAULT_PORT)),
+        float(d.get("interval", DEFAULT_INTERVAL)),
+    )
+
+
+def request_check(host=None, port=None, timeout=300):
+    if host is None or port is None:
+        cfg_host, cfg_port, _ = daemon_settings()
+        host, port = host or cfg_host, port or cfg_port
+    req = urlrequest.Request(f"http://{host}:{port}/check", data=b"", method="POST")
+    try:
+        with urlrequest.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))["messages"]
+    except (URLError, OSError, ValueError, KeyError):
+        return None
+
+
+class CheckDaemon:
+    def __init__(self, interval: float, logic=None):
+        if logic is None:
+            # imported here so the GUI can ask a running daemon without loading the checker
+            from crypto_shark.logic import CryptoWatcherLogic
+            logic = CryptoWatcherLogic()
+        self.interval = interval
+        self.logic = logic
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.cycles = 0
+        self.last_run = None
+        self.last_duration = None
+        self.last_messages = []
+        self.next_run = time.time()
+
+    def warm_up(self):
+        self.logic.load_pipeline()
+
+    def run_cycle(self):
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                messages = self.logic.run_checks()
+            except Exception as e:
+                messages = [f"Check failed: {e}"]
+            self.cycles += 1
+            self.last_run = datetime.utcnow().isoformat()
+            self.last_duration = time.perf_counter() - start
+            self.last_messages = messages
+        for m in messages:
+            print(m, flush=True)
+        return messages
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def status(self):
+        return {
+            "cycles": self.cycles,
+            "running": self._lock.locked(),
+            "interval": self.interval,
+            "last_run": self.last_run,
+            "last_duration": self.last_duration,
+            "next_run": datetime.utcfromtimestamp(self.next_run).isoformat(),
+            "last_messages": self.last_messages,
+        }
+
+    def serve_forever(self):
+        while not self._stop.is_set():
+            delay = self.next_run - time.time()
+            if delay > 0:
+                self._wake.wait(delay)
+            if self._stop.is_set():
+                break
+            self._wake.clear()
+            self.next_run = time.time() + self.interval
+            self.run_cycle()
+
+
+def make_handler(daemon: CheckDaemon):
+    class ControlHandler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/status":
+                self._reply(200, daemon.status())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path == "/check":
+                self._reply(200, {"messages": daemon.run_cycle()})
+            elif self.path == "/trigger":
+                daemon.trigger()
+                self._reply(202, {"queued": True})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return ControlHandler
+
+
+def main(argv=None):
+    host, port, interval = daemon_settings()
+    parser = argparse.ArgumentParser(prog="python -m crypto_shark.daemon")
+    parser.add_argument("--interval", type=float, default=interval,
+                        help="seconds between checks (sub-minute values allowed)")
+    parser.add_argument("--host", default=host)
+    parser.add_argument("--port", type=int, default=port)
+    args = parser.parse_args(argv)
+
+    daemon = CheckDaemon(args.interval)
+    daemon.warm_up()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(daemon))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Crypto Shark daemon on http://{args.host}:{args.port} every {args.interval:g}s", flush=True)
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        server.shutdown()
+        daemon.logic.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import math
+import re
+import zlib
+
+import numpy as np
+
+
+THRESHOLD = 0.6
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 3
+WEIGHTS = ("one", "sqrt", "log", "full")
+DEFAULT_WEIGHT = "one"
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_CHUNK = 1 << 16
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_HANDLE = re.compile(r"(?:^|\s)(?:@|/?u/)\w+")
+_WORD = re.compile(r"[\w$]+")
+_REPEAT = re.compile(r"(.)\1{2,}")
+
+
+def normalize(text):
+    # bots vary links, handles, emoji and punctuation between copies; the words stay the same
+    text = text.lower()
+    if "http" in text or "www." in text:
+        text = _URL.sub(" ", text)
+    if "@" in text or "u/" in text:
+        text = _HANDLE.sub(" ", text)
+    return " ".join(_WORD.findall(_REPEAT.sub(r"\1\1", text)))
+
+
+def shingles(norm, k=SHINGLE):
+    words = norm.split()
+    if len(words) <= k:
+        return {zlib.crc32(norm.encode("utf-8"))}
+    # str hashes are salted per process, which is fine: signatures are only compared within one call
+    return {hash(g) & 0xFFFFFFFF for g in zip(*(words[j:] for j in range(k)))}
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # keep the earliest text as the root so it becomes the cluster's representative
+            self.parent[max(a, b)] = min(a, b)
+
+
+class Deduper:
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS,
+                 shingle=SHINGLE, weight=DEFAULT_WEIGHT, seed=1):
+        if num_perm % bands:
+            raise ValueError("dedup.num_perm must be a multiple of dedup.bands")
+        if weight not in WEIGHTS:
+            raise ValueError(f"Unknown dedup weight: {weight} (use one of {', '.join(WEIGHTS)})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.weight_mode = weight
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE), num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, int(_MERSENNE), num_perm, dtype=np.uint64)[:, None]
+
+    @classmethod
+    def from_config(cls, cfg):
+        if not cfg.get("enabled", True):
+            return None
+        return cls(
+            threshold=cfg.get("threshold", THRESHOLD),
+            num_perm=cfg.get("num_perm", NUM_PERM),
+            bands=cfg.get("bands", BANDS),
+            shingle=cfg.get("shingle", SHINGLE),
+            weight=cfg.get("weight", DEFAULT_WEIGHT)
+        )
+
+    def weight(self, n):
+        if self.weight_mode == "one":
+            return 1.0
+        if self.weight_mode == "sqrt":
+            return math.sqrt(n)
+        if self.weight_mode == "log":
+            return 1.0 + math.log(n)
+        return float(n)
+
+    def signatures(self, sets):
+        sigs = np.empty((len(sets), self.num_perm), dtype=np.uint64)
+        start = 0
+        while start < len(sets):
+            # hash a bounded number of shingles at a time to cap the (num_perm, shingles) matrix
+            end, total = start, 0
+            while end < len(sets) and (total == 0 or total + len(sets[end]) <= _CHUNK):
+                total += len(sets[end])
+                end += 1
+            lens = np.fromiter((len(s) for s in sets[start:end]), dtype=np.int64, count=end - start)
+            flat = np.fromiter((h for s in sets[start:end] for h in s), dtype=np.uint64, count=total)
+            # a*h wraps modulo 2**64 on purpose; the low bits after the modulo are well mixed
+            with np.errstate(over="ignore"):
+                hashed = ((self._a * flat[None, :] + self._b) % _MERSENNE) & _MAX_HASH
+            offsets = np.concatenate([[0], np.cumsum(lens)[:-1]])
+            sigs[start:end] = np.minimum.reduceat(hashed, offsets, axis=1).T
+            start = end
+        return sigs
+
+    def clusters(self, texts):
+        exact = {}
+        for i, t in enumerate(texts):
+            exact.setdefault(normalize(t), []).append(i)
+        norms = list(exact)
+        groups = list(exact.values())
+
+        uf = _UnionFind(len(norms))
+        if len(norms) > 1:
+            sigs = self.signatures([shingles(n, self.shingle) for n in norms])
+            for b in range(self.bands):
+                band = np.ascontiguousarray(sigs[:, b * self.rows:(b + 1) * self.rows])
+                _, first, bucket = np.unique(
+                    band.view(f"V{band.shape[1] * 8}").ravel(), return_index=True, return_inverse=True
+                )
+                # compare against the bucket's first member only, so spam floods stay linear
+                heads = first[bucket.ravel()]
+                cand = np.flatnonzero(heads != np.arange(len(norms)))
+                if not len(cand):
+                    continue
+                sim = (sigs[heads[cand]] == sigs[cand]).mean(axis=1)
+                for head, i in zip(heads[cand][sim >= self.threshold].tolist(),
+                                   cand[sim >= self.threshold].tolist()):
+                    uf.union(head, i)
+
+        merged = {}
+        for g, members in enumerate(groups):
+            merged.setdefault(uf.find(g), []).extend(members)
+        return sorted((sorted(m) for m in merged.values()), key=lambda m: m[0])
@@ -1,32 +1,88 @@
 
-import requests
+from collections import OrderedDict
+from datetime import datetime, timedelta
 
-from PySide6.QtCore import Qt, QRunnable, Slot, QThreadPool, Signal, QSize
-from PySide6.QtGui import QPixmap, QIcon
+from PySide6.QtCore import (
+    Qt, QSize, QAbstractTableModel, QAbstractListModel, QModelIndex
+)
+from PySide6.QtGui import QIcon, QFont
 from PySide6.QtWidgets import (
-    QDialog, QScrollArea, QWidget, QGridLayout,
-    QVBoxLayout, QPushButton, QLabel, QSizePolicy
+    QDialog, QListView, QLineEdit,
+    QVBoxLayout, QHBoxLayout,
+    QTableView, QComboBox, QHeaderView
 )
 
-class IconLoader(QRunnable):
-    def __init__(self, url: str, button: QPushButton, signal: Signal):
-        super().__init__()
-        self.url, self.button, self.signal = url, button, signal
-
-    @Slot()
-    def run(self):
-        try:
-            resp = requests.get(self.url, timeout=5)
-            resp.raise_for_status()
-            pix = QPixmap(); pix.loadFromData(resp.content)
-            icon = QIcon(pix)
-            self.signal.emit(self.button, icon)
-        except:
-            pass
+from crypto_shark.coins import CoinSearchIndex
+from crypto_shark.icon_loader import icon_service
+from crypto_shark.logstore import COLUMNS, LogStore
 
-class AddCryptoDialog(QDialog):
 
-    icon_ready = Signal(object, object)
+COIN_ICON_SZ = 48
+COIN_CELL = QSize(120, 96)
+
+
+class CoinGridModel(QAbstractListModel):
+    def __init__(self, coins, parent=None):
+        super().__init__(parent)
+        self.coins = coins
+        self.search_index = CoinSearchIndex(coins)
+        self.icons = icon_service()
+        self._rows = list(range(len(coins)))
+        self._row_of = {}
+        self._pending = set()
+        self._bold = QFont()
+        self._bold.setBold(True)
+
+    def set_query(self, text):
+        self.beginResetModel()
+        self._rows = self.search_index.search(text)
+        self._row_of = {}
+        self.endResetModel()
+
+    def coin_id(self, row):
+        return self.coins[self._rows[row]]["id"]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        coin = self.coins[self._rows[index.row()]]
+        if role == Qt.DisplayRole:
+            return coin["symbol"].upper()
+        if role == Qt.ToolTipRole:
+            return coin.get("name")
+        if role == Qt.FontRole:
+            return self._bold
+        if role == Qt.DecorationRole:
+            return self._icon(index.row(), coin)
+        return None
+
+    def _icon(self, row, coin):
+        # data() is only asked for painted cells, so offscreen coins never download
+        url = coin.get("image")
+        if not url:
+            return None
+        pix = self.icons.cached(url, COIN_ICON_SZ)
+        if pix is not None:
+            return QIcon(pix)
+        if url not in self._pending:
+            self._pending.add(url)
+            self.icons.request(url, COIN_ICON_SZ, lambda _pix, u=url, cid=coin["id"]: self._icon_ready(u, cid))
+        return None
+
+    def _icon_ready(self, url, cid):
+        self._pending.discard(url)
+        if not self._row_of:
+            self._row_of = {self.coins[i]["id"]: r for r, i in enumerate(self._rows)}
+        row = self._row_of.get(cid)
+        if row is not None:
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+
+class AddCryptoDialog(QDialog):
 
     def __init__(self, parent=None, coins=None):
         super().__init__(parent)
@@ -38,53 +94,176 @@ class AddCryptoDialog(QDialog):
 
         layout = QVBoxLayout(self)
 
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        layout.addWidget(scroll)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search by name, symbol or id…")
+        self.search.setClearButtonEnabled(True)
+        layout.addWidget(self.search)
 
-        container = QWidget()
-        grid = QGridLayout(container)
-        scroll.setWidget(container)
+        self.model = CoinGridModel(self.coins, self)
 
+        view = QListView()
+        view.setViewMode(QListView.IconMode)
+        view.setResizeMode(QListView.Adjust)
+        view.setMovement(QListView.Static)
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QListView.Batched)
+        view.setIconSize(QSize(COIN_ICON_SZ, COIN_ICON_SZ))
+        view.setGridSize(COIN_CELL)
+        view.setWordWrap(False)
+        view.setModel(self.model)
+        view.setStyleSheet("""
+            QListView::item {
+                background-color: #3A4D5A;
+                border: 2px solid #607D8B;
+                border-radius: 8px;
+                color: white;
+                margin: 4px;
+            }""")
+        view.clicked.connect(lambda idx: self._select(self.model.coin_id(idx.row())))
+        layout.addWidget(view)
 
-        self.pool = QThreadPool.globalInstance()
-        self.icon_ready.connect(self._set_button_icon)
 
+        self.search.textChanged.connect(self.model.set_query)
+        self.search.returnPressed.connect(self._select_first)
 
-        for idx, coin in enumerate(self.coins):
-            row, col = divmod(idx, 5)
+    def _select_first(self):
+        if self.model.rowCount():
+            self._select(self.model.coin_id(0))
 
-            frame = QWidget()
-            vbox = QVBoxLayout(frame)
-            vbox.setContentsMargins(4,4,4,4)
-            vbox.setSpacing(4)
-            frame.setStyleSheet("""
-                background-color: #3A4D5A;
-                border: 2px solid #607D8B;
-                border-radius: 8px;""")
+    def _select(self, coin_id: str):
+        self.selected = coin_id
+        self.accept()
 
-            btn = QPushButton()
-            btn.setFixedSize(64,64)
-            btn.setIconSize(QSize(48,48))
-            btn.setStyleSheet("background: transparent; border: none;")
-            btn.clicked.connect(lambda _, cid=coin["id"]: self._select(cid))
-            vbox.addWidget(btn, alignment=Qt.AlignCenter)
 
-            label = QLabel(coin["symbol"].upper())
-            label.setAlignment(Qt.AlignCenter)
-            label.setStyleSheet("color: white; font-weight: bold;")
-            vbox.addWidget(label)
+LOG_HEADERS = ["Timestamp", "Coin", "Price", "Change", "PosSent", "NegSent", "AlertSent"]
+LOG_PAGE = 200
+LOG_PAGES_KEPT = 16
+LOG_RANGES = [
+    ("All time", None),
+    ("Last 24 hours", timedelta(days=1)),
+    ("Last 7 days", timedelta(days=7)),
+    ("Last 30 days", timedelta(days=30)),
+]
 
-            grid.addWidget(frame, row, col)
 
+class LogTableModel(QAbstractTableModel):
+    def __init__(self, store: LogStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.coin = None
+        self.since = None
+        self.order_by = "ts"
+        self.descending = True
+        self._total = 0
+        self._pages = OrderedDict()
+        self.refresh()
 
-            loader = IconLoader(coin["image"], btn, self.icon_ready)
-            self.pool.start(loader)
+    def refresh(self):
+        self.beginResetModel()
+        self._pages.clear()
+        self._total = self.store.count(self.coin, self.since)
+        self.endResetModel()
 
-    @Slot(object, object)
-    def _set_button_icon(self, button: QPushButton, icon: QIcon):
-        button.setIcon(icon)
+    def set_filter(self, coin=None, since=None):
+        self.coin, self.since = coin, since
+        self.refresh()
 
-    def _select(self, coin_id: str):
-        self.selected = coin_id
-        self.accept()
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._total
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return LOG_HEADERS[section]
+        return None
+
+    def _row(self, row):
+        page_no = row // LOG_PAGE
+        page = self._pages.get(page_no)
+        if page is None:
+            # only pages the view actually paints are queried; old ones are dropped
+            page = self.store.query(
+                self.coin, self.since, order_by=self.order_by, descending=self.descending,
+                offset=page_no * LOG_PAGE, limit=LOG_PAGE
+            )
+            self._pages[page_no] = page
+            while len(self._pages) > LOG_PAGES_KEPT:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_no)
+        idx = row - page_no * LOG_PAGE
+        return page[idx] if idx < len(page) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ForegroundRole:
+            return Qt.white
+        if role != Qt.DisplayRole:
+            return None
+        rec = self._row(index.row())
+        if rec is None:
+            return None
+        val = rec[index.column()]
+        col = COLUMNS[index.column()]
+        if col == "price":
+            return f"{val:.2f}"
+        if col == "pct":
+            return f"{val or 0:+.2f}%"
+        if col in ("pos", "neg"):
+            return f"{val:.0%}"
+        if col == "alert":
+            return "Yes" if val else "No"
+        return val
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.order_by = COLUMNS[column]
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+
+class LogsDialog(QDialog):
+    def __init__(self, parent=None, store: LogStore = None):
+        super().__init__(parent)
+        self.setWindowTitle("Logs History")
+        self.resize(900, 600)
+        self.store = store or LogStore()
+
+        layout = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        self.coin_box = QComboBox()
+        self.coin_box.addItem("All coins", None)
+        for coin in self.store.coins():
+            self.coin_box.addItem(coin, coin)
+        self.range_box = QComboBox()
+        for label, span in LOG_RANGES:
+            self.range_box.addItem(label, span)
+        filters.addWidget(self.coin_box)
+        filters.addWidget(self.range_box)
+        filters.addStretch()
+        layout.addLayout(filters)
+
+        self.model = LogTableModel(self.store, self)
+        table = QTableView()
+        table.setModel(self.model)
+        table.setSortingEnabled(True)
+        table.sortByColumn(0, Qt.DescendingOrder)
+        table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.setStyleSheet("""
+            QTableView { background-color: #2b2b2b; color: white; gridline-color: #444; }
+            QHeaderView::section { background-color: #3c3f41; color: white; font-weight: bold; }
+            QTableCornerButton::section { background-color: #3c3f41; border: 1px solid #555; }
+        """)
+        layout.addWidget(table)
+
+        self.coin_box.currentIndexChanged.connect(self._apply_filter)
+        self.range_box.currentIndexChanged.connect(self._apply_filter)
+
+    def _apply_filter(self):
+        span = self.range_box.currentData()
+        since = (datetime.utcnow() - span).isoformat() if span else None
+        self.model.set_filter(self.coin_box.currentData(), since)
@@ -1,115 +1,197 @@
 
 import sys
-import os
-import json
-import time
-from datetime import datetime
+import argparse
+import contextlib
+import threading
 from pathlib import Path
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QHBoxLayout, QVBoxLayout,
-    QLabel, QPushButton, QListWidget, QListWidgetItem,
-    QFrame, QDialog, QTableWidget, QTableWidgetItem,
-    QMessageBox
+    QLabel, QPushButton, QListView, QAbstractItemView,
+    QFrame, QDialog, QMessageBox
+)
+from PySide6.QtCore import (
+    Qt, QSize, QRunnable, Slot, QThreadPool, Signal, QTimer,
+    QAbstractListModel, QModelIndex
 )
-from PySide6.QtCore import Qt, QSize, QRunnable, Slot, QThreadPool, Signal
 from PySide6.QtGui import QPixmap, QIcon, QFontDatabase, QFont
 
-from crypto_shark.dialogs import AddCryptoDialog
-from crypto_shark.logic import CryptoWatcherLogic
+from crypto_shark.coins import coin_store, CACHE_FILE
+from crypto_shark.daemon import request_check
+from crypto_shark.dialogs import AddCryptoDialog, LogsDialog
+from crypto_shark.icon_loader import icon_service
+from crypto_shark.logstore import COLUMNS, LogStore, LOG_DB
+from crypto_shark.metrics import StartupProfile
+from crypto_shark.statestore import read_json, update_json
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG = BASE_DIR / "config.json"
-CACHE_FILE = BASE_DIR / "coins_cache.json"
 LOG_FILE = BASE_DIR / "logs.txt"
 STYLE_QSS = BASE_DIR / "style.qss"
 ICONS_DIR = BASE_DIR / "icons"
 FONTS_DIR = BASE_DIR / "fonts"
 
-CACHE_TTL = 3600
 ICON_SZ = 48
 
 
-class IconLoader(QRunnable):
-    def __init__(self, url: str, row: int, sig: Signal):
+class CheckWorker(QRunnable):
+    def __init__(self, get_logic, done_signal: Signal):
         super().__init__()
-        self.url, self.row, self.sig = url, row, sig
+        self.get_logic = get_logic
+        self.done_signal = done_signal
 
     @Slot()
     def run(self):
         try:
-            resp = __import__("requests").get(self.url, timeout=5)
-            resp.raise_for_status()
-            pix = QPixmap()
-            pix.loadFromData(resp.content)
-            self.sig.emit(self.row, pix)
-        except:
-            pass
+            messages = request_check()
+            if messages is None:
+                messages = self.get_logic().run_checks()
+        except Exception as e:
+            # e.g. a missing DISCORD_WEBHOOK_URL when the checker is first built
+            messages = [f"Error: {e}"]
+        self.done_signal.emit(messages)
 
 
-class CheckWorker(QRunnable):
-    def __init__(self, logic: CryptoWatcherLogic, done_signal: Signal):
+class MarketRefresh(QRunnable):
+    def __init__(self, store, done_signal: Signal):
         super().__init__()
-        self.logic = logic
+        self.store = store
         self.done_signal = done_signal
 
     @Slot()
     def run(self):
-        messages = self.logic.run_checks()
-        self.done_signal.emit(messages)
+        try:
+            self.store.refresh()
+        except Exception as e:
+            print("Error fetching coin markets:", e)
+        self.done_signal.emit()
+
+
+class WatchlistModel(QAbstractListModel):
+    def __init__(self, font: QFont, parent=None):
+        super().__init__(parent)
+        self.font = font
+        self._ids = []
+        self._values = {}
+        self._icons = {}
+
+    def coin_id(self, row):
+        return self._ids[row]
+
+    def ids(self):
+        return list(self._ids)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        cid = self._ids[index.row()]
+        if role == Qt.DisplayRole:
+            return self._text(cid, self._values.get(cid, {}))
+        if role == Qt.DecorationRole:
+            return self._icons.get(cid)
+        if role == Qt.FontRole:
+            return self.font
+        if role == Qt.SizeHintRole:
+            return QSize(0, ICON_SZ + 16)
+        if role == Qt.UserRole:
+            return cid
+        return None
+
+    def _text(self, cid, v):
+        text = f"{cid.upper()}: ${v.get('price') or 0:,.2f} — ${int(v.get('mc') or 0):,} — ({v.get('dom', 0.0):.2f}%)"
+        if v.get("neg") is not None:
+            text += f" — POS {v['pos']:.0%} / NEG {v['neg']:.0%}"
+        return text
+
+    def set_tickers(self, tickers):
+        # rows move only on add/remove; everything else goes through update()
+        wanted = list(dict.fromkeys(tickers))
+        keep = set(wanted)
+        for row in range(len(self._ids) - 1, -1, -1):
+            if self._ids[row] not in keep:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                cid = self._ids.pop(row)
+                self._values.pop(cid, None)
+                self._icons.pop(cid, None)
+                self.endRemoveRows()
+        present = set(self._ids)
+        new = [cid for cid in wanted if cid not in present]
+        if new:
+            first = len(self._ids)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            self._ids.extend(new)
+            self.endInsertRows()
+        return new
+
+    def update(self, values):
+        for row, cid in enumerate(self._ids):
+            v = values.get(cid)
+            if v is None or v == self._values.get(cid):
+                continue
+            self._values[cid] = v
+            idx = self.index(row)
+            self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+
+    def has_icon(self, cid):
+        return cid in self._icons
+
+    def set_icon(self, cid, pix):
+        if cid not in self._ids:
+            return
+        self._icons[cid] = QIcon(pix)
+        idx = self.index(self._ids.index(cid))
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
 
 
 class CryptoWatcherGUI(QWidget):
-    icon_ready = Signal(int, QPixmap)
     checks_done = Signal(list)
+    markets_done = Signal()
 
-    def __init__(self, rajdhani_family: str, comforter_family: str):
+    def __init__(self, rajdhani_family: str, comforter_family: str, profile: StartupProfile = None):
         super().__init__()
         self.rajdhani, self.comforter = rajdhani_family, comforter_family
+        self.profile = profile
         self.pool = QThreadPool.globalInstance()
-        self.icon_ready.connect(self._set_icon)
+        self.icons = icon_service()
         self.checks_done.connect(self._on_checks_done)
+        self.markets_done.connect(self._on_markets_done)
 
         self.setWindowTitle("Crypto Shark")
         self.setMinimumSize(1200, 800)
 
 
-        self.coins = self._load_or_fetch_top100()
-        self.total_market_cap = sum(c.get("market_cap", 0) for c in self.coins)
+        with self._step("coin cache"):
+            # whatever is on disk is shown right away; fresh market data arrives in the background
+            self.store = coin_store(CACHE_FILE).configure(self._coins_cfg())
+            self.coins = self.store.load()
+            self.total_market_cap = self.store.total_market_cap()
 
+        self.logic = None
+        self._logic_lock = threading.Lock()
+        with self._step("log store"):
+            self.logstore = LogStore(LOG_DB, legacy=LOG_FILE)
 
-        self.logic = CryptoWatcherLogic()
 
+        with self._step("build ui"):
+            self._init_ui()
+        with self._step("watchlist"):
+            self._load_tickers(self._read_tickers())
 
-        self._init_ui()
-        self._load_tickers()
+        if self.store.is_stale():
+            self.pool.start(MarketRefresh(self.store, self.markets_done))
 
-    def _load_or_fetch_top100(self):
-        if CACHE_FILE.exists() and time.time() - CACHE_FILE.stat().st_mtime < CACHE_TTL:
-            try:
-                return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
-            except:
-                pass
+    def _step(self, name):
+        return self.profile.step(name) if self.profile else contextlib.nullcontext()
+
+    def _coins_cfg(self):
         try:
-            resp = __import__("requests").get(
-                "https://api.coingecko.com/api/v3/coins/markets",
-                params={
-                    "vs_currency": "usd",
-                    "order": "market_cap_desc",
-                    "per_page": 100,
-                    "page": 1,
-                    "sparkline": "false"
-                },
-                timeout=10
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            CACHE_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
-            return data
-        except Exception as e:
-            print("Error fetching Top-100:", e)
-            return []
+            return read_json(CONFIG).get("coins", {})
+        except:
+            return {}
 
     def _init_ui(self):
         layout = QHBoxLayout(self)
@@ -162,45 +244,70 @@ class CryptoWatcherGUI(QWidget):
         ml.setSpacing(10)
         ml.addWidget(QLabel("Watchlist:"))
 
-        self.crypto_list = QListWidget()
+        self.watchlist = WatchlistModel(QFont(self.rajdhani, 14, weight=QFont.Bold), self)
+        self.crypto_list = QListView()
+        self.crypto_list.setModel(self.watchlist)
         self.crypto_list.setIconSize(QSize(ICON_SZ, ICON_SZ))
+        self.crypto_list.setUniformItemSizes(True)
+        self.crypto_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.crypto_list.setFocusPolicy(Qt.NoFocus)
 
         ml.addWidget(self.crypto_list)
 
         layout.addWidget(main, 1)
 
-    def _load_tickers(self):
-        self.crypto_list.clear()
+    def _read_tickers(self):
         try:
-            cfg = json.loads(CONFIG.read_text(encoding="utf-8"))
-            tickers = cfg.get("tickers", [])
+            return read_json(CONFIG).get("tickers", [])
         except:
-            tickers = []
-
-        for idx, cid in enumerate(tickers):
-            obj = next((c for c in self.coins if c["id"] == cid), {})
-            mc  = obj.get("market_cap", 0)
-            dom = mc / self.total_market_cap * 100 if self.total_market_cap else 0.0
-            price = obj.get("current_price", 0.0)
-            text = f"{cid.upper()}: ${price:,.2f} — ${int(mc):,} — ({dom:.2f}%)"
-
-            item = QListWidgetItem(text)
-            item.setFont(QFont(self.rajdhani, 14, weight=QFont.Bold))
-            item.setData(Qt.UserRole, cid)
-            item.setSizeHint(QSize(item.sizeHint().width(), ICON_SZ + 16))
-            self.crypto_list.addItem(item)
+            return []
 
-            if (url := obj.get("image")):
-                self.pool.start(IconLoader(url, idx, self.icon_ready))
+    def _load_tickers(self, tickers=None):
+        if tickers is not None:
+            self.watchlist.set_tickers(tickers)
+        ids = self.watchlist.ids()
+        latest = self.logstore.latest(ids)
+
+        values = {}
+        for cid in ids:
+            obj = self.store.get(cid, {})
+            mc = obj.get("market_cap") or 0
+            v = {
+                "price": obj.get("current_price"),
+                "mc": mc,
+                "dom": mc / self.total_market_cap * 100 if self.total_market_cap else 0.0,
+                "pos": None,
+                "neg": None,
+            }
+            if row := latest.get(cid):
+                # the last check is usually newer than the market snapshot
+                rec = dict(zip(COLUMNS, row))
+                v.update(price=rec["price"], pos=rec["pos"], neg=rec["neg"])
+            values[cid] = v
+        self.watchlist.update(values)
+
+        for cid in ids:
+            url = self.store.get(cid, {}).get("image")
+            if url and not self.watchlist.has_icon(cid):
+                self.icons.request(url, ICON_SZ, lambda pix, cid=cid: self.watchlist.set_icon(cid, pix))
 
-    @Slot(int, QPixmap)
-    def _set_icon(self, row, pix):
-        if itm := self.crypto_list.item(row):
-            itm.setIcon(QIcon(pix))
+    @Slot()
+    def _on_markets_done(self):
+        self.coins = self.store.coins
+        self.total_market_cap = self.store.total_market_cap()
+        self._load_tickers()
+        if self.profile:
+            self.profile.mark("market refresh (background)")
+            print(f"  {'market refresh (background)':<32} {self.profile.steps[-1][1]:8.3f}s", flush=True)
 
     @Slot(list)
     def _on_checks_done(self, messages):
+        if messages and messages[0].startswith("Error"):
+            QMessageBox.warning(self, "Check failed", "\n".join(messages))
+            return
+        # a daemon check may have rewritten the coin cache; load() is a no-op if it did not
+        self.coins = self.store.load()
+        self.total_market_cap = self.store.total_market_cap()
         self._load_tickers()
         self.open_logs()
 
@@ -208,68 +315,54 @@ class CryptoWatcherGUI(QWidget):
         dlg = AddCryptoDialog(self, coins=self.coins)
         if dlg.exec() == QDialog.Accepted and getattr(dlg, "selected", None):
             new = dlg.selected
-            cfg = json.loads(CONFIG.read_text(encoding="utf-8"))
-            if new not in cfg.get("tickers", []):
-                cfg["tickers"].append(new)
-                CONFIG.write_text(json.dumps(cfg, indent=2), encoding="utf-8")
-                self._load_tickers()
+
+            def add(cfg):
+                if new not in cfg.setdefault("tickers", []):
+                    cfg["tickers"].append(new)
+
+            cfg = update_json(CONFIG, add)
+            self._load_tickers(cfg["tickers"])
 
     def _remove_selected(self):
-        items = self.crypto_list.selectedItems()
-        if not items:
+        selected = {self.watchlist.coin_id(i.row()) for i in self.crypto_list.selectionModel().selectedRows()}
+        if not selected:
             return
-        cfg = json.loads(CONFIG.read_text(encoding="utf-8"))
-        for it in items:
-            cid = it.data(Qt.UserRole)
-            if cid in cfg.get("tickers", []):
-                cfg["tickers"].remove(cid)
-            self.crypto_list.takeItem(self.crypto_list.row(it))
-        CONFIG.write_text(json.dumps(cfg, indent=2), encoding="utf-8")
+        cfg = update_json(
+            CONFIG, lambda c: c.update(tickers=[cid for cid in c.get("tickers", []) if cid not in selected])
+        )
+        self.watchlist.set_tickers(cfg["tickers"])
+
+    def _get_logic(self):
+        # two quick clicks run two workers; only the first one builds the checker
+        with self._logic_lock:
+            if self.logic is None:
+                # the checker (and the model stack behind it) is only loaded for the first local check
+                from crypto_shark.logic import CryptoWatcherLogic
+                self.logic = CryptoWatcherLogic()
+            return self.logic
 
     def _on_check(self):
-        self.pool.start(CheckWorker(self.logic, self.checks_done))
+        self.pool.start(CheckWorker(self._get_logic, self.checks_done))
         QMessageBox.information(self, "Checking", "Background check started.")
 
     def open_logs(self):
-        try:
-            lines = LOG_FILE.read_text(encoding="utf-8").splitlines()
-        except:
-            lines = []
-
-        table = QTableWidget(len(lines), 7, self)
-        table.setHorizontalHeaderLabels([
-            "Timestamp", "Coin", "Price", "Change", "PosSent", "NegSent", "AlertSent"
-        ])
-        table.setStyleSheet("""
-            QTableWidget { background-color: #2b2b2b; color: white; gridline-color: #444; }
-            QHeaderView::section { background-color: #3c3f41; color: white; font-weight: bold; }
-            QTableCornerButton::section { background-color: #3c3f41; border: 1px solid #555; }
-        """)
-
-        for i, line in enumerate(lines):
-            parts = [p.strip() for p in line.split("  ")]
-            for j, val in enumerate(parts):
-                display = "Yes" if (j == 6 and val == "1") else ("No" if j == 6 else val)
-                item = QTableWidgetItem(display)
-                item.setForeground(Qt.white)
-                table.setItem(i, j, item)
-
-        table.resizeColumnsToContents()
-        table.resizeRowsToContents()
-
-        w = sum(table.columnWidth(c) for c in range(table.columnCount())) + table.verticalHeader().width() + 4
-        h = sum(table.rowHeight(r) for r in range(table.rowCount())) + table.horizontalHeader().height() + 4
-
-        dlg = QDialog(self)
-        dlg.setWindowTitle("Logs History")
-        dlg.resize(w + 20, h + 20)
-        lay = QVBoxLayout(dlg)
-        lay.addWidget(table)
-        dlg.exec()
+        LogsDialog(self, store=self.logstore).exec()
+
+    def closeEvent(self, event):
+        with self._logic_lock:
+            if self.logic is not None:
+                self.logic.close(timeout=3)
+        super().closeEvent(event)
 
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(prog="python -m crypto_shark.gui")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print an import-time and init-time breakdown")
+    args, qt_args = parser.parse_known_args()
+    profile = StartupProfile("gui") if args.profile_startup else None
+
+    app = QApplication(sys.argv[:1] + qt_args)
 
 
     r_id = QFontDatabase.addApplicationFont(str(FONTS_DIR / "Rajdhani-Regular.ttf"))
@@ -289,8 +382,13 @@ def main():
 
     app.setStyleSheet(STYLE_QSS.read_text(encoding="utf-8"))
 
-    w = CryptoWatcherGUI(raj, com)
+    w = CryptoWatcherGUI(raj, com, profile)
     w.show()
+    if profile:
+        def first_paint():
+            profile.mark("window shown")
+            print(profile.report("crypto_shark.gui"), flush=True)
+        QTimer.singleShot(0, first_paint)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from crypto_shark.statestore import file_stamp, write_atomic
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+HISTORY_FILE = BASE_DIR / "history.npy"
+
+CAPACITY = 2048
+FIELDS = ("ts", "price", "pos", "neg")
+TS, PRICE, POS, NEG = range(len(FIELDS))
+DEFAULT_WINDOWS = ("5m", "1h", "24h")
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def window_seconds(spec):
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd])\s*", str(spec))
+    if not m:
+        raise ValueError(f"Bad window: {spec!r} (use e.g. 5m, 1h, 24h)")
+    return float(m.group(1)) * _UNITS[m.group(2)]
+
+
+class PriceHistory:
+    def __init__(self, path: Path = HISTORY_FILE, capacity=CAPACITY):
+        self.path = path
+        self.index_path = path.with_suffix(".json")
+        self.capacity = capacity
+        self.coins = []
+        self.rows = {}
+        self.head = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.data = None
+        self._stamp = None
+        self._load()
+
+    def _load(self):
+        self._stamp = file_stamp(self.index_path)
+        if not (self.path.exists() and self.index_path.exists()):
+            return
+        try:
+            meta = json.loads(self.index_path.read_text(encoding="utf-8"))
+            # memory mapped: only the pages a window actually touches are read from disk
+            data = np.load(self.path, mmap_mode="r+")
+        except (OSError, ValueError):
+            return
+        if data.shape[0] != len(meta["coins"]) or data.shape[2] != len(FIELDS):
+            return
+        self.data = data
+        self.capacity = data.shape[1]
+        self.coins = meta["coins"]
+        self.rows = {c: i for i, c in enumerate(self.coins)}
+        self.head = np.asarray(meta["head"], dtype=np.int64)
+        self.count = np.asarray(meta["count"], dtype=np.int64)
+
+    def reload(self):
+        # the ring's head and count live in the index; a stale copy would overwrite another
+        # process's newest slots, so re-read both whenever someone else has saved
+        if file_stamp(self.index_path) == self._stamp:
+            return
+        self.data = None
+        self.coins = []
+        self.rows = {}
+        self.head = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self._load()
+
+    def _grow(self, new_coins):
+        n_old = len(self.coins)
+        n_new = n_old + len(new_coins)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        grown = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=np.float64, shape=(n_new, self.capacity, len(FIELDS))
+        )
+        if n_old:
+            grown[:n_old] = self.data
+        grown.flush()
+        del grown
+        self.data = None
+        os.replace(tmp, self.path)
+        self.data = np.load(self.path, mmap_mode="r+")
+
+        self.coins = self.coins + list(new_coins)
+        self.rows = {c: i for i, c in enumerate(self.coins)}
+        self.head = np.concatenate([self.head, np.zeros(len(new_coins), dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(len(new_coins), dtype=np.int64)])
+
+    def append(self, ts, points):
+        if not points:
+            return
+        new = [c for c in points if c not in self.rows]
+        if new:
+            self._grow(new)
+
+        idx = np.fromiter((self.rows[c] for c in points), dtype=np.int64, count=len(points))
+        values = np.array([(ts, p, pos, neg) for p, pos, neg in points.values()], dtype=np.float64)
+        self.data[idx, self.head[idx]] = values
+        self.head[idx] = (self.head[idx] + 1) % self.capacity
+        self.count[idx] = np.minimum(self.count[idx] + 1, self.capacity)
+
+    def save(self):
+        if self.data is None:
+            return
+        self.data.flush()
+        meta = {"coins": self.coins, "head": self.head.tolist(), "count": self.count.tolist()}
+        write_atomic(self.index_path, json.dumps(meta, separators=(",", ":")))
+        self._stamp = file_stamp(self.index_path)
+
+    def _ordered(self, coins):
+        # rotate every ring so column 0 is the oldest slot, all rows in one gather
+        idx = np.array([self.rows[c] for c in coins], dtype=np.int64)
+        order = (self.head[idx, None] + np.arange(self.capacity)[None, :]) % self.capacity
+        block = np.take_along_axis(self.data[idx], order[:, :, None], axis=1)
+        filled = np.arange(self.capacity)[None, :] >= (self.capacity - self.count[idx])[:, None]
+        return block, filled
+
+    def window_stats(self, coins, windows, now):
+        known = [c for c in coins if c in self.rows]
+        out = {w: {} for w in windows}
+        if not known or self.data is None:
+            return out
+
+        block, filled = self._ordered(known)
+        ts, price, neg = block[..., TS], block[..., PRICE], block[..., NEG]
+        latest_price = price[:, -1]
+        latest_neg = neg[:, -1]
+        oldest = np.where(filled, ts, np.inf).min(axis=1)
+
+        # coins with too few points in a window give all-NaN rows; those are reported as None
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for w in windows:
+                inside = filled & (ts >= now - window_seconds(w)) & (price > 0)
+                # a window the ring does not reach back across (the coin is newer than the
+                # window, or capacity runs out first) would silently shrink to what is left
+                n = np.where(oldest <= now - window_seconds(w), inside.sum(axis=1), 0)
+
+                first = np.where(inside.any(axis=1), inside.argmax(axis=1), 0)
+                ref = price[np.arange(len(known)), first]
+                pct = np.where(n >= 2, (latest_price - ref) / ref * 100, np.nan)
+
+                logp = np.where(inside, np.log(np.where(price > 0, price, 1.0)), np.nan)
+                rets = np.diff(logp, axis=1)
+                vol = np.where(n >= 3, np.nanstd(rets, axis=1), np.nan)
+
+                negs = np.where(inside, neg, np.nan)
+                mean = np.nanmean(negs, axis=1)
+                std = np.nanstd(negs, axis=1)
+                z = np.where((n >= 3) & (std > 0), (latest_neg - mean) / std, np.nan)
+
+                for i, coin in enumerate(known):
+                    out[w][coin] = {
+                        "pct": None if np.isnan(pct[i]) else float(pct[i]),
+                        "volatility": None if np.isnan(vol[i]) else float(vol[i]),
+                        "sentiment_z": None if np.isnan(z[i]) else float(z[i]),
+                    }
+        return out
+
+
+def window_rule_hits(rules, stats, coin, pct_neg):
+    hits = []
+    for w, rule in rules.items():
+        s = stats.get(w, {}).get(coin)
+        if not s:
+            continue
+        checks = []
+        if "pct" in rule:
+            checks.append(s["pct"] is not None and abs(s["pct"]) >= rule["pct"])
+        if "volatility" in rule:
+            checks.append(s["volatility"] is not None and s["volatility"] >= rule["volatility"])
+        if "sentiment_z" in rule:
+            checks.append(s["sentiment_z"] is not None and s["sentiment_z"] >= rule["sentiment_z"])
+        if "sentiment" in rule:
+            checks.append(pct_neg >= rule["sentiment"])
+        if checks and all(checks):
+            hits.append(w)
+    return hits
@@ -1,23 +1,165 @@
-from PySide6.QtCore import QRunnable, Slot, QThreadPool, Signal
-from PySide6.QtGui import QPixmap
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
 
+import requests
+from requests.adapters import HTTPAdapter
+from PySide6.QtCore import QObject, QRunnable, Qt, QThreadPool, Signal, Slot
+from PySide6.QtGui import QImage, QPixmap
 
-class IconLoader(QRunnable):
-    def __init__(self, url, list_widget, row, signal):
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ICON_CACHE_DIR = BASE_DIR / "icon_cache"
+
+ICON_TTL = 7 * 24 * 3600
+ICON_CACHE_MAX_BYTES = 64 * 2**20
+MEMORY_ITEMS = 1024
+POOL_SIZE = 8
+
+
+class DiskIconStore:
+    def __init__(self, root: Path, ttl=ICON_TTL, max_bytes=ICON_CACHE_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index_path = root / "index.json"
+        root.mkdir(parents=True, exist_ok=True)
+        try:
+            self._index = json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _blob(self, digest):
+        return self.root / digest[:2] / digest
+
+    def get(self, url):
+        with self._lock:
+            entry = self._index.get(url)
+        if not entry:
+            return None, False
+        try:
+            data = self._blob(entry["hash"]).read_bytes()
+        except OSError:
+            return None, False
+        return data, time.time() - entry["ts"] < self.ttl
+
+    def put(self, url, data):
+        # content-addressed: many coins share placeholder logos, stored once
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self._blob(digest)
+        if not blob.exists():
+            blob.parent.mkdir(exist_ok=True)
+            blob.write_bytes(data)
+        with self._lock:
+            self._index[url] = {"hash": digest, "ts": time.time(), "size": len(data)}
+            self._evict()
+            self._index_path.write_text(json.dumps(self._index, separators=(",", ":")), encoding="utf-8")
+
+    def _evict(self):
+        blobs = {}
+        for e in self._index.values():
+            blobs[e["hash"]] = max(blobs.get(e["hash"], 0), e["ts"])
+        sizes = {e["hash"]: e["size"] for e in self._index.values()}
+        total = sum(sizes.values())
+        for digest in sorted(blobs, key=blobs.get):
+            if total <= self.max_bytes:
+                break
+            total -= sizes[digest]
+            self._index = {u: e for u, e in self._index.items() if e["hash"] != digest}
+            self._blob(digest).unlink(missing_ok=True)
+
+
+class _IconFetch(QRunnable):
+    def __init__(self, url, service):
         super().__init__()
-        self.url = url
-        self.list_w = list_widget
-        self.row = row
-        self.signal = signal
+        self.url, self.service = url, service
 
     @Slot()
     def run(self):
-        try:
-            import requests
-            resp = requests.get(self.url, timeout=5)
-            resp.raise_for_status()
-            pix = QPixmap()
-            pix.loadFromData(resp.content)
-            self.signal.emit(self.row, pix)
-        except:
-            pass
+        data, fresh = self.service.disk.get(self.url)
+        if not fresh:
+            try:
+                resp = self.service.session.get(self.url, timeout=5)
+                resp.raise_for_status()
+                data = resp.content
+                self.service.disk.put(self.url, data)
+            except (requests.RequestException, OSError):
+                # stale or missing: fall back to whatever is on disk so icons work offline
+                pass
+
+        image = QImage()
+        if data:
+            image.loadFromData(data)
+        self.service._fetched.emit(self.url, image)
+
+
+class IconService(QObject):
+    _fetched = Signal(str, QImage)
+
+    def __init__(self, root: Path = ICON_CACHE_DIR, parent=None):
+        super().__init__(parent)
+        self.disk = DiskIconStore(root)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.pool = QThreadPool.globalInstance()
+        self._memory = OrderedDict()
+        self._waiting = {}
+        self._fetched.connect(self._on_fetched)
+
+    def cached(self, url, size):
+        pix = self._memory.get((url, size))
+        if pix is not None:
+            self._memory.move_to_end((url, size))
+        return pix
+
+    def request(self, url, size, callback):
+        if not url:
+            return
+        pix = self.cached(url, size)
+        if pix is not None:
+            callback(pix)
+            return
+
+        waiting = self._waiting.get(url)
+        if waiting is None:
+            self._waiting[url] = waiting = []
+            self.pool.start(_IconFetch(url, self))
+        # concurrent requests for the same URL share the single download above
+        waiting.append((size, callback))
+
+    @Slot(str, QImage)
+    def _on_fetched(self, url, image):
+        waiting = self._waiting.pop(url, [])
+        if image.isNull():
+            return
+        for size, callback in waiting:
+            pix = self.cached(url, size)
+            if pix is None:
+                pix = QPixmap.fromImage(
+                    image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                )
+                self._memory[(url, size)] = pix
+                while len(self._memory) > MEMORY_ITEMS:
+                    self._memory.popitem(last=False)
+            try:
+                callback(pix)
+            except RuntimeError:
+                # the widget that asked was destroyed before the icon arrived
+                pass
+
+
+_service = None
+
+
+def icon_service():
+    global _service
+    if _service is None:
+        _service = IconService()
+    return _service
@@ -0,0 +1,328 @@
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+ONNX_DIR = BASE_DIR / "models" / "distilbert-sst2-onnx"
+PARITY_CORPUS = BASE_DIR / "fixtures" / "sentiment_corpus.txt"
+
+DEFAULT_BATCH_SIZE = 16
+MAX_LENGTH = 512
+MIN_SHARD = 64
+WORKER_TIMEOUT = 300.0
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, threads=None):
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+
+        from transformers import pipeline as hf_pipeline
+        self.batch_size = batch_size
+        self._pipeline = hf_pipeline(
+            "sentiment-analysis",
+            model=MODEL_NAME,
+            device=-1
+        )
+
+    def after_fork(self, threads):
+        import torch
+        torch.set_num_threads(threads)
+
+    def __call__(self, texts):
+        return self._pipeline(
+            texts,
+            batch_size=self.batch_size,
+            truncation=True,
+            max_length=MAX_LENGTH
+        )
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_dir: Path = ONNX_DIR, quantize=True,
+                 batch_size=DEFAULT_BATCH_SIZE, threads=None):
+        # imported only to fail before the export below, which can take minutes, if it is missing
+        import onnxruntime  # noqa: F401
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.model_dir = Path(model_dir)
+        self.batch_size = batch_size
+        model_path = self._ensure_exported(quantize)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.id2label = AutoConfig.from_pretrained(self.model_dir).id2label
+
+        self.model_path = model_path
+        self.session = self._make_session(threads)
+
+    def _make_session(self, threads):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        return ort.InferenceSession(
+            str(self.model_path), opts, providers=["CPUExecutionProvider"]
+        )
+
+    def after_fork(self, threads):
+        # ORT's thread pool does not survive fork; the tokenizer and config stay shared
+        self.session = self._make_session(threads)
+
+    def _ensure_exported(self, quantize):
+        fp32 = self.model_dir / "model.onnx"
+        int8 = self.model_dir / "model.int8.onnx"
+        target = int8 if quantize else fp32
+        if target.exists():
+            return target
+
+        if not fp32.exists():
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            self.model_dir.mkdir(parents=True, exist_ok=True)
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+            model.eval()
+
+            dummy = tokenizer(["crypto shark"], return_tensors="pt")
+            torch.onnx.export(
+                model,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                str(fp32),
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "seq"},
+                    "attention_mask": {0: "batch", 1: "seq"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=14
+            )
+            tokenizer.save_pretrained(self.model_dir)
+            model.config.save_pretrained(self.model_dir)
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(str(fp32), str(int8), weight_type=QuantType.QInt8)
+        return target
+
+    def __call__(self, texts):
+        import numpy as np
+
+        if not texts:
+            return []
+        enc = self.tokenizer(list(texts), truncation=True, max_length=MAX_LENGTH)
+        ids = enc["input_ids"]
+
+        # length buckets: neighbours in sorted order pad to almost the same length
+        order = sorted(range(len(ids)), key=lambda i: len(ids[i]))
+        results = [None] * len(ids)
+        for b in range(0, len(order), self.batch_size):
+            chunk = order[b:b + self.batch_size]
+            width = max(len(ids[i]) for i in chunk)
+            input_ids = np.zeros((len(chunk), width), dtype=np.int64)
+            mask = np.zeros((len(chunk), width), dtype=np.int64)
+            for row, i in enumerate(chunk):
+                input_ids[row, :len(ids[i])] = ids[i]
+                mask[row, :len(ids[i])] = 1
+
+            logits = self.session.run(["logits"], {"input_ids": input_ids, "attention_mask": mask})[0]
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+            for row, i in enumerate(chunk):
+                best = int(probs[row].argmax())
+                results[i] = {"label": self.id2label[best], "score": float(probs[row, best])}
+        return results
+
+
+_worker_backend = None
+
+
+def _init_worker(threads, cfg):
+    global _worker_backend
+    if _worker_backend is None:
+        # forkserver children start from a clean interpreter and load their own copy
+        _worker_backend = make_backend({**cfg, "workers": 1, "threads": threads})
+    else:
+        _worker_backend.after_fork(threads)
+
+
+def _run_shard(texts):
+    return _worker_backend(texts)
+
+
+class ShardedBackend:
+    def __init__(self, inner, workers, min_shard=MIN_SHARD, cfg=None, timeout=WORKER_TIMEOUT):
+        global _worker_backend
+        self.inner = inner
+        self.name = f"{inner.name}x{workers}"
+        self.workers = workers
+        self.min_shard = min_shard
+        self.timeout = timeout
+        self._pool = None
+
+        methods = multiprocessing.get_all_start_methods()
+        # a fork taken while another thread holds a lock (fetch pool, alert dispatcher,
+        # an import) copies that lock held forever, so fork only from a single-threaded process
+        if "fork" in methods and threading.active_count() == 1:
+            method = "fork"
+        elif "forkserver" in methods and cfg is not None:
+            method = "forkserver"
+            print("Other threads are running; inference workers load their own model copy")
+        else:
+            print("Inference workers need fork(); running in-process")
+            return
+
+        if method == "fork":
+            # the model is loaded once here; forked workers share its weights copy-on-write,
+            # and frozen objects are skipped by the GC so collections don't touch those pages
+            _worker_backend = inner
+            gc.collect()
+            gc.freeze()
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        try:
+            self._pool = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_init_worker,
+                initargs=(threads, cfg or {})
+            )
+            # workers are started on first submit; do it now, before any caller threads exist
+            self._pool.submit(os.getpid).result(timeout=self.timeout)
+        except (OSError, BrokenProcessPool, FutureTimeout) as e:
+            print(f"Could not start inference workers ({e}); running in-process")
+            self.close()
+        finally:
+            if method == "fork":
+                gc.unfreeze()
+
+    def __call__(self, texts):
+        texts = list(texts)
+        if self._pool is None or len(texts) < 2 * self.min_shard:
+            return self.inner(texts)
+
+        # deal by length so every shard gets a similar mix of short and long texts
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        n = min(self.workers, len(texts) // self.min_shard)
+        shards = [order[w::n] for w in range(n)]
+        try:
+            futures = [self._pool.submit(_run_shard, [texts[i] for i in shard]) for shard in shards]
+            # a killed worker breaks the pool at once; a hung one is caught by the timeout
+            parts = [f.result(timeout=self.timeout) for f in futures]
+        except Exception as e:
+            print(f"Inference workers failed ({e!r}); running in-process from now on")
+            self.close()
+            return self.inner(texts)
+
+        results = [None] * len(texts)
+        for shard, part in zip(shards, parts):
+            for i, res in zip(shard, part):
+                results[i] = res
+        return results
+
+    def close(self):
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        # shutdown() alone would wait on a hung worker; the executor exposes no terminate()
+        for proc in list((getattr(pool, "_processes", None) or {}).values()):
+            proc.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def model_id(cfg=None):
+    # changes whenever the configured backend could label the same text differently
+    cfg = cfg or {}
+    name = cfg.get("backend", "torch")
+    if name == "onnx":
+        name += "-int8" if cfg.get("quantize", True) else "-fp32"
+    return f"{name}:{MODEL_NAME}"
+
+
+def make_backend(cfg=None):
+    cfg = cfg or {}
+    name = cfg.get("backend", "torch")
+    batch_size = cfg.get("batch_size", DEFAULT_BATCH_SIZE)
+    threads = cfg.get("threads")
+    if name == "onnx":
+        backend = OnnxBackend(
+            Path(cfg.get("model_dir", ONNX_DIR)),
+            quantize=cfg.get("quantize", True),
+            batch_size=batch_size,
+            threads=threads
+        )
+    elif name == "torch":
+        backend = TorchBackend(batch_size=batch_size, threads=threads)
+    else:
+        raise ValueError(f"Unknown inference backend: {name}")
+
+    workers = cfg.get("workers", 1)
+    if workers == "auto":
+        workers = os.cpu_count() or 1
+    if workers > 1:
+        return ShardedBackend(
+            backend, workers, cfg.get("min_shard", MIN_SHARD), cfg, cfg.get("worker_timeout", WORKER_TIMEOUT)
+        )
+    return backend
+
+
+def parity_check(corpus: Path, quantize=True, threads=None):
+    texts = [l.strip() for l in corpus.read_text(encoding="utf-8").splitlines() if l.strip()]
+    ref = TorchBackend(threads=threads)(texts)
+    got = OnnxBackend(quantize=quantize, threads=threads)(texts)
+
+    agree = sum(r["label"] == g["label"] for r, g in zip(ref, got))
+    # compare P(POSITIVE) so a flipped label counts as its full probability gap
+    p_ref = [r["score"] if r["label"] == "POSITIVE" else 1 - r["score"] for r in ref]
+    p_got = [g["score"] if g["label"] == "POSITIVE" else 1 - g["score"] for g in got]
+    max_delta = max((abs(a - b) for a, b in zip(p_ref, p_got)), default=0.0)
+    return {
+        "texts": len(texts),
+        "agreement": agree / len(texts) if texts else 1.0,
+        "max_prob_delta": max_delta,
+        "mismatches": [t for t, r, g in zip(texts, ref, got) if r["label"] != g["label"]],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crypto_shark.inference")
+    parser.add_argument("--parity", nargs="?", const=str(PARITY_CORPUS), metavar="CORPUS",
+                        help="compare the ONNX backend against PyTorch on a text corpus")
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    if not args.parity:
+        OnnxBackend(quantize=not args.no_quantize, threads=args.threads)
+        print(f"ONNX model ready in {ONNX_DIR}")
+        return 0
+
+    report = parity_check(Path(args.parity), quantize=not args.no_quantize, threads=args.threads)
+    print(f"texts: {report['texts']}")
+    print(f"label agreement: {report['agreement']:.2%}")
+    print(f"max P(positive) delta: {report['max_prob_delta']:.4f}")
+    for t in report["mismatches"]:
+        print(f"  mismatch: {t}")
+    return 0 if report["agreement"] >= args.min_agreement else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
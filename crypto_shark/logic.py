@@ -1,21 +1,38 @@
 
 import os
-import json
-import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FetchTimeout
 from datetime import datetime
 from pathlib import Path
 
 from dotenv import load_dotenv
-import praw
-import tweepy
 
+from crypto_shark.alerts import AlertDispatcher, SPOOL_FILE, stranded_alerts, webhook_spool
+from crypto_shark.coins import coin_store
+from crypto_shark.dedup import Deduper
+from crypto_shark.history import (
+    PriceHistory, HISTORY_FILE, CAPACITY, DEFAULT_WINDOWS, window_rule_hits
+)
+from crypto_shark.inference import make_backend, model_id
+from crypto_shark.logstore import LogStore, LOG_DB
+from crypto_shark.prices import PriceClient, PRICE_CACHE_FILE
+from crypto_shark.metrics import CycleMetrics
+from crypto_shark.matcher import AliasMatcher, build_aliases
+from crypto_shark.sampling import AdaptiveSampler, wilson_halfwidth
+from crypto_shark.sentiment_cache import SentimentCache, text_key, DEFAULT_MAX_ENTRIES
+from crypto_shark.statestore import StateStore, read_json, try_hold
+from crypto_shark.window import SentimentWindow, DEFAULT_WINDOW_MINUTES
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CONFIG = BASE_DIR / "config.json"
 STATE_FILE = BASE_DIR / "state.json"
 CACHE_FILE = BASE_DIR / "coins_cache.json"
 LOG_FILE = BASE_DIR / "logs.txt"
+SENTIMENT_CACHE_FILE = BASE_DIR / "sentiment_cache.json"
+WINDOW_FILE = BASE_DIR / "window.json"
+STREAM_FILE = BASE_DIR / "stream"
 
 
 ALIASES = {
@@ -27,92 +44,364 @@ ALIASES = {
 
 }
 
+FETCH_TIMEOUTS = {"reddit": 60.0, "twitter": 20.0, "prices": 20.0}
+FETCH_WORKERS = 8
+
 class CryptoWatcherLogic:
-    def __init__(self):
+    def __init__(self, base_dir: Path = None):
         super().__init__()
         load_dotenv()
 
-        cfg = self._load_json(CONFIG)
+        base = Path(base_dir) if base_dir else BASE_DIR
+        self.config_path = base / CONFIG.name
+        self.state_path  = base / STATE_FILE.name
+        self.cache_path  = base / CACHE_FILE.name
+        self.log_path    = base / LOG_FILE.name
+        self.stream_path = base / STREAM_FILE.name
+
+        cfg = self._load_json(self.config_path)
         th  = cfg.get("thresholds", {})
         self.th_pct  = th.get("pct", 3.0)
         self.th_sent = th.get("sentiment", 0.6)
 
-        self.config_path = CONFIG
-        self.state_path  = STATE_FILE
-        self.state = self._load_json(self.state_path) or {}
+        self.store = StateStore(self.state_path)
+        self.state = self.store.load()
 
         self.webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
         if not self.webhook_url:
             raise RuntimeError("DISCORD_WEBHOOK_URL not set")
 
-        self.reddit = praw.Reddit(
+        self._local = threading.local()
+        # praw and tweepy take longer to import than everything else here, so the
+        # clients are built on first fetch; a missing token still fails fast
+        self._reddit = None
+        self._twitter = None
+        self._bearer = os.getenv("TWITTER_BEARER_TOKEN")
+        if not self._bearer:
+            raise RuntimeError("TWITTER_BEARER_TOKEN not set")
+
+        self.metrics = CycleMetrics()
+        self.inference_cfg = cfg.get("inference", {})
+        self._pipeline = None
+        if self.inference_cfg.get("workers", 1) != 1:
+            # inference workers are forked now, while no fetch or dispatcher thread exists yet
+            self.load_pipeline()
+        self._executor = ThreadPoolExecutor(
+            max_workers=cfg.get("fetch", {}).get("workers", FETCH_WORKERS),
+            thread_name_prefix="crypto-fetch"
+        )
+
+        self.alerts = AlertDispatcher.from_config(
+            self.webhook_url,
+            cfg.get("alerts", {}),
+            base / SPOOL_FILE.name,
+            on_retry=lambda: self.metrics.count("http_retries")
+        )
+        self._alerts_cfg = cfg.get("alerts", {})
+        self._dispatchers = {self.webhook_url: self.alerts}
+
+        self.prices = PriceClient.from_config(
+            cfg.get("prices", {}),
+            base / PRICE_CACHE_FILE.name,
+            on_retry=lambda: self.metrics.count("http_retries")
+        )
+
+        self.sentiment_cache = SentimentCache(
+            base / SENTIMENT_CACHE_FILE.name,
+            cfg.get("sentiment_cache", {}).get("max_entries", DEFAULT_MAX_ENTRIES),
+            model_id(self.inference_cfg)
+        )
+        self.deduper = Deduper.from_config(cfg.get("dedup", {}))
+        self.sampler = AdaptiveSampler.from_config(cfg.get("sampling", {}))
+        self.window = SentimentWindow(
+            base / WINDOW_FILE.name,
+            cfg.get("window", {}).get("minutes", DEFAULT_WINDOW_MINUTES) * 60
+        )
+        self.coins = coin_store(self.cache_path).configure(cfg.get("coins", {}))
+        self._coins_refresh = None
+        self.logstore = LogStore(base / LOG_DB.name, legacy=self.log_path)
+        self.history = PriceHistory(
+            base / HISTORY_FILE.name, cfg.get("history", {}).get("capacity", CAPACITY)
+        )
+        self._apply_pending()
+        self._staged_marks = {}
+        self._matcher = None
+        self._matcher_key = None
+
+    @property
+    def reddit(self):
+        if self._reddit is None:
+            self._reddit = self._make_reddit()
+        return self._reddit
+
+    @reddit.setter
+    def reddit(self, client):
+        self._reddit = client
+
+    @property
+    def twitter(self):
+        if self._twitter is None:
+            import tweepy
+            self._twitter = tweepy.Client(bearer_token=self._bearer, wait_on_rate_limit=False)
+        return self._twitter
+
+    @twitter.setter
+    def twitter(self, client):
+        self._twitter = client
+
+    def _make_reddit(self):
+        import praw
+        return praw.Reddit(
             client_id=os.getenv("REDDIT_CLIENT_ID"),
             client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
             user_agent=os.getenv("REDDIT_USER_AGENT")
         )
 
-        bearer = os.getenv("TWITTER_BEARER_TOKEN")
-        if not bearer:
-            raise RuntimeError("TWITTER_BEARER_TOKEN not set")
-        self.twitter = tweepy.Client(bearer_token=bearer, wait_on_rate_limit=False)
-
-        self._pipeline = None
+    def _thread_reddit(self):
+        # PRAW instances are not thread-safe, so each fetch thread gets its own
+        if threading.current_thread() is threading.main_thread():
+            return self.reddit
+        if getattr(self._local, "reddit", None) is None:
+            self._local.reddit = self._make_reddit()
+        return self._local.reddit
 
     def _load_json(self, path: Path):
-        if path.exists():
-            return json.loads(path.read_text(encoding="utf-8"))
-        return {}
-
-    def _save_json(self, data, path: Path):
-        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        return read_json(path)
+
+    def _save_progress(self):
+        with self.metrics.span("file_io"), self.store.locked():
+            # the window first: once state.json is committed the log holding its batches is gone
+            self.window.save()
+            self.history.save()
+            self.sentiment_cache.save()
+            self.store.commit(self.state)
+
+    def _get_matcher(self, tickers):
+        key = (tuple(tickers), self.coins.version)
+        if self._matcher is None or self._matcher_key != key:
+            known = [c for c in map(self.coins.get, tickers) if c]
+            self._matcher = AliasMatcher(build_aliases(tickers, known, ALIASES))
+            self._matcher_key = key
+        return self._matcher
 
     def get_prices_batch(self, coins):
-        ids = ",".join(coins)
-        resp = requests.get(
-            "https://api.coingecko.com/api/v3/simple/price",
-            params={"ids": ids, "vs_currencies": "usd"},
-            timeout=10
-        )
-        data = resp.json()
-        return {c: data.get(c, {}).get("usd", 0.0) for c in coins}
+        with self.metrics.span("fetch_prices", coins=len(coins)):
+            return self.prices.get(coins)
+
+    def _source_mark(self, key):
+        return self.state.setdefault("_sources", {}).get(key, {})
+
+    def _set_source_mark(self, key, mark):
+        # staged until run_checks has consumed the batch, so a fetch that times out
+        # does not advance the mark past comments that were never classified
+        self._staged_marks[key] = mark
+
+    def _commit_source_mark(self, key):
+        if key in self._staged_marks:
+            mark = self._staged_marks.pop(key)
+            self.state.setdefault("_sources", {})[key] = mark
+            return mark
+        return None
+
+    def _log_batch(self, source, mark, rows):
+        # the new mark and the window entries it covers go into the log as one line, so after
+        # a crash both are replayed or neither is: no text is skipped, none is counted twice
+        seq = max(time.time_ns(), self.window.seq + 1)
+        self.store.record([(("_pending", str(seq)), {"source": source, "mark": mark, "rows": rows})])
+        self.window.seq = seq
+
+    def _apply_pending(self):
+        # batches logged by a cycle that never reached _save_progress
+        pending = self.state.pop("_pending", {})
+        for seq in sorted(pending, key=int):
+            batch = pending[seq]
+            if batch["mark"] is not None:
+                self.state.setdefault("_sources", {})[batch["source"]] = batch["mark"]
+            if int(seq) > self.window.seq:
+                for row in batch["rows"]:
+                    self.window.add(*row)
+                self.window.seq = int(seq)
+
+    def _reload(self):
+        # cron, the daemon and the GUI take turns under the state lock; each turn starts
+        # from what the previous one saved rather than from this process's older copy
+        self.state = self.store.load()
+        self.window.reload()
+        self.history.reload()
+        self.sentiment_cache.reload()
+        self._apply_pending()
+
+    def hold_data_files(self):
+        # streaming mode keeps state, window and history in memory for its whole run, so it
+        # takes them over from cron, the daemon and the GUI instead of taking turns with them
+        with self.store.locked():
+            lease = try_hold(self.stream_path)
+            if lease is None:
+                raise RuntimeError("another stream already owns the data files")
+            self._reload()
+        return lease
+
+    def _streaming(self):
+        lease = try_hold(self.stream_path)
+        if lease is None:
+            return True
+        lease.close()
+        return False
 
     def get_comments(self, subreddit="CryptoCurrency", limit=200):
-        return [c.body for c in self.reddit.subreddit(subreddit).comments(limit=limit)]
+        key = f"reddit:{subreddit}"
+        mark = self._source_mark(key)
+        seen, seen_utc = mark.get("fullname"), mark.get("created_utc", 0)
+
+        # the listing is newest first, so stop paginating at the last comment we saw
+        new = []
+        with self.metrics.span("fetch_reddit", subreddit=subreddit):
+            for c in self._thread_reddit().subreddit(subreddit).comments(limit=limit):
+                if c.fullname == seen or c.created_utc < seen_utc:
+                    break
+                new.append(c)
+
+        if new:
+            self._set_source_mark(key, {"fullname": new[0].fullname, "created_utc": new[0].created_utc})
+        return [c.body for c in new]
 
     def get_tweets(self, query: str, max_results: int = 50):
+        import tweepy
+
+        mark = self._source_mark("twitter")
+        since_id = mark.get("since_id") if mark.get("query") == query else None
         try:
-            resp = self.twitter.search_recent_tweets(
-                query=query, tweet_fields=["lang"], max_results=max_results
-            )
+            with self.metrics.span("fetch_twitter"):
+                resp = self.twitter.search_recent_tweets(
+                    query=query, tweet_fields=["lang"], max_results=max_results, since_id=since_id
+                )
         except tweepy.TooManyRequests:
             print("RATE LIMIT HIT FOR TWITTER – skipping tweets this run")
             return []
+        except tweepy.BadRequest as e:
+            # since_id older than the 7-day search window is rejected, start over next run
+            self._set_source_mark("twitter", {})
+            self._commit_source_mark("twitter")
+            print(f"Twitter error: {e} – skipping tweets this run")
+            return []
         except Exception as e:
             print(f"Twitter error: {e} – skipping tweets this run")
             return []
 
+        newest = (resp.meta or {}).get("newest_id")
+        if newest:
+            self._set_source_mark("twitter", {"query": query, "since_id": newest})
         return [t.text for t in (resp.data or []) if t.lang == "en"]
 
+    def load_pipeline(self):
+        if not self._pipeline:
+            with self.metrics.span("model_load"):
+                self._pipeline = make_backend(self.inference_cfg)
+        return self._pipeline
+
     def analyze_sentiment(self, texts):
 
         texts = [t[:2000] for t in texts]
 
-        if not self._pipeline:
-            from transformers import pipeline as hf_pipeline
-            self._pipeline = hf_pipeline(
-                "sentiment-analysis",
-                model="distilbert-base-uncased-finetuned-sst-2-english",
-                device=-1
+        pipeline = self.load_pipeline()
+        with self.metrics.span("inference", texts=len(texts)):
+            results = pipeline(texts)
+        self.metrics.count("texts_classified", len(texts))
+        return results
+
+    def classify(self, texts):
+        unique = {}
+        for t in texts:
+            unique.setdefault(t[:2000], None)
+
+        keys = {t: text_key(t) for t in unique}
+        todo = []
+        for t, key in keys.items():
+            cached = self.sentiment_cache.get(key)
+            if cached is None:
+                todo.append(t)
+            else:
+                unique[t] = cached
+
+        if todo:
+            for t, res in zip(todo, self.analyze_sentiment(todo)):
+                unique[t] = res
+                self.sentiment_cache.put(keys[t], res)
+        return unique
+
+    def label_batch(self, batch, stratum=None):
+        # one model call and one vote per near-duplicate cluster instead of per copy
+        if self.deduper is None:
+            clusters = [[i] for i in range(len(batch))]
+        else:
+            with self.metrics.span("dedup", texts=len(batch)):
+                clusters = self.deduper.clusters([t for t, _ in batch])
+            self.metrics.count("duplicates_collapsed", len(batch) - len(clusters))
+
+        heads = [batch[m[0]][0] for m in clusters]
+        coin_sets = [set().union(*(batch[i][1] for i in m)) for m in clusters]
+        weights = [self.deduper.weight(len(m)) if self.deduper else 1.0 for m in clusters]
+
+        if self.sampler is None or stratum is None:
+            labels = self.classify(heads)
+            return [
+                (m[0], coin_sets[k], labels[heads[k][:2000]]["label"], weights[k])
+                for k, m in enumerate(clusters)
+            ]
+
+        def label(idx):
+            labels = self.classify(heads[k] for k in idx)
+            return [labels[heads[k][:2000]]["label"] for k in idx]
+
+        with self.metrics.span("sampling", source=stratum, clusters=len(clusters)):
+            picked, scale = self.sampler.sample(stratum, coin_sets, label)
+        self.metrics.count("texts_sampled_out", len(clusters) - len(picked))
+        # split per coin: each coin's sample stands for a different share of this source
+        return [
+            (clusters[k][0], {c}, lab, weights[k] * scale[c])
+            for k, lab in picked
+            for c in coin_sets[k]
+        ]
+
+    def _dispatcher(self, url):
+        d = self._dispatchers.get(url)
+        if d is None:
+            # each extra webhook gets its own spool, so one desk's outage never holds back another
+            d = self._dispatchers[url] = AlertDispatcher.from_config(
+                url,
+                self._alerts_cfg,
+                webhook_spool(self.alerts.spool.base, url),
+                on_retry=lambda: self.metrics.count("http_retries")
             )
-
-
-        return self._pipeline(
-            texts,
-            batch_size=16,
-            truncation=True,
-            max_length=512
-        )
-    def send_discord_embed(self, coin, price, pct, pct_pos, pct_neg, count_msgs, image_url):
+        return d
+
+    def _profiles(self, cfg):
+        base_th = cfg.get("thresholds", {})
+        if not cfg.get("profiles"):
+            return [{"name": None, "tickers": cfg.get("tickers", []),
+                     "thresholds": base_th, "webhook": self.webhook_url}]
+
+        profiles = []
+        for name, p in cfg["profiles"].items():
+            if "config" in p:
+                # a desk can keep its own config.json; keys set inline win
+                own = self._load_json(self.config_path.parent / p["config"])
+                p = {**own, **{k: v for k, v in p.items() if k != "config"}}
+            webhook = p.get("webhook") or (p.get("webhook_env") and os.getenv(p["webhook_env"]))
+            profiles.append({
+                "name": name,
+                "tickers": p.get("tickers", []),
+                "thresholds": {**base_th, **p.get("thresholds", {})},
+                "webhook": webhook or self.webhook_url,
+            })
+        return profiles
+
+    def _profile_state(self, name):
+        if name is None:
+            return self.state
+        return self.state.setdefault("_profiles", {}).setdefault(name, {})
+
+    def send_discord_embed(self, coin, price, pct, pct_pos, pct_neg, count_msgs, image_url, webhook=None):
         if pct is None:
             color = 0x808080
         elif pct > 0:
@@ -133,71 +422,235 @@ class CryptoWatcherLogic:
             ],
             "footer": {"text": datetime.utcnow().strftime("Timestamp: %Y-%m-%d %H:%M:%S")}
         }
-        payload = {"username": "CryptoWatcherBot", "embeds": [embed]}
-        requests.post(self.webhook_url, json=payload, timeout=5).raise_for_status()
+        # delivered by the dispatcher thread, so a slow or rate-limited webhook never stalls the cycle
+        self._dispatcher(webhook or self.webhook_url).send(embed)
+
+    def close(self, timeout=10):
+        if hasattr(self._pipeline, "close"):
+            self._pipeline.close()
+        flushed = True
+        for d in self._dispatchers.values():
+            flushed = d.close(timeout) and flushed
+        return flushed
+
+    def _start_fetches(self, tickers, cfg):
+        fetch_cfg = cfg.get("fetch", {})
+        timeouts = {**FETCH_TIMEOUTS, **fetch_cfg.get("timeouts", {})}
+        limit = fetch_cfg.get("reddit_limit", 1000)
+
+        jobs = {}
+        for sub in cfg.get("subreddits") or ["CryptoCurrency"]:
+            fut = self._executor.submit(self.get_comments, sub, limit)
+            jobs[fut] = (f"reddit:{sub}", timeouts["reddit"])
+
+        query = " OR ".join(f"#{c}" for c in tickers) + " -is:retweet lang:en"
+        fut = self._executor.submit(self.get_tweets, query, 100)
+        jobs[fut] = ("twitter", timeouts["twitter"])
+
+        prices = self._executor.submit(self.get_prices_batch, tickers)
+        return jobs, prices, timeouts["prices"]
+
+    def _iter_fetched(self, jobs, start):
+        pending = dict(jobs)
+        while pending:
+            now = time.monotonic()
+            for fut, (name, limit) in list(pending.items()):
+                if not fut.done() and now - start >= limit:
+                    print(f"{name} timed out after {limit:g}s – skipping this run")
+                    del pending[fut]
+            if not pending:
+                break
+
+            until = min(start + limit for _, limit in pending.values()) - now
+            done, _ = wait(pending, timeout=max(until, 0), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, _ = pending.pop(fut)
+                try:
+                    yield name, fut.result()
+                except Exception as e:
+                    print(f"{name} error: {e} – skipping this run")
 
     def run_checks(self):
-        cfg = self._load_json(self.config_path) or {}
-        tickers = cfg.get("tickers", [])
+        self.metrics.start_cycle()
+        with self.metrics.span("config_load"):
+            cfg = self._load_json(self.config_path) or {}
+            self.coins.configure(cfg.get("coins", {})).load()
+        if self.coins.is_stale() and (self._coins_refresh is None or self._coins_refresh.done()):
+            # never block a check on market metadata; the next cycle picks up the new file
+            self._coins_refresh = self._executor.submit(self._refresh_coins)
+
+        ok = False
+        try:
+            # one check at a time across cron, the daemon and the GUI; state is re-read
+            # under the lock in case another process checked since this one last did
+            with self.store.locked():
+                if self._streaming():
+                    messages = ["Error: streaming mode owns the data files – skipping this check"]
+                    return messages
+                self._reload()
+                messages = self._check_cycle(cfg)
+            ok = not messages or not messages[0].startswith("Error")
+            return messages
+        finally:
+            self.metrics.count("cache_hits", self.sentiment_cache.hits)
+            self.metrics.finish_cycle(ok)
+            self._write_metrics(cfg.get("metrics", {}))
+
+    def _write_metrics(self, metrics_cfg):
+        try:
+            if path := metrics_cfg.get("textfile"):
+                self.metrics.write_textfile(Path(path))
+            if path := metrics_cfg.get("trace"):
+                self.metrics.append_trace(Path(path))
+        except OSError as e:
+            print(f"Metrics error: {e}")
+
+    def _refresh_coins(self):
+        try:
+            self.coins.refresh()
+        except Exception as e:
+            print("Error fetching coin markets:", e)
+
+    def _check_cycle(self, cfg):
+        th = cfg.get("thresholds", {})
+        self.th_pct = th.get("pct", self.th_pct)
+        self.th_sent = th.get("sentiment", self.th_sent)
+        profiles = self._profiles(cfg)
+        for p in profiles:
+            # started up front so alerts spooled by an earlier crash are resent now
+            self._dispatcher(p["webhook"])
+        # every profile shares one fetch, one price request and one classification pass
+        tickers = list(dict.fromkeys(c for p in profiles for c in p["tickers"]))
         messages = []
-
-        reddit_texts = self.get_comments(limit=1000)
-        query = " OR ".join(f"#{c}" for c in tickers) + " -is:retweet lang:en"
-        twitter_texts = self.get_tweets(query=query, max_results=100)
-        all_texts = reddit_texts + twitter_texts
+        for spool, n in stranded_alerts(self.alerts.spool.base, [p["webhook"] for p in profiles]).items():
+            messages.append(f"{n} undelivered alerts in {spool} belong to a webhook no longer in config")
+
+        with self.metrics.span("match_build"):
+            matcher = self._get_matcher(tickers)
+
+        start = time.monotonic()
+        jobs, prices_future, prices_timeout = self._start_fetches(tickers, cfg)
+
+        self.window.span = cfg.get("window", {}).get("minutes", DEFAULT_WINDOW_MINUTES) * 60
+        self.sentiment_cache.reset_stats()
+        if self.sampler is not None:
+            self.sampler.reset()
+        fetched = 0
+        # classify each source as soon as it arrives while the others keep downloading
+        for source, texts in self._iter_fetched(jobs, start):
+            mark = self._commit_source_mark(source)
+            fetched += len(texts)
+            self.metrics.count("texts_fetched", len(texts))
+            batch = []
+            with self.metrics.span("match", source=source, texts=len(texts)):
+                for text in texts:
+                    if coins := matcher.match(text):
+                        batch.append((text, coins))
+            now = time.time()
+            rows = []
+            for _, coins, label, weight in self.label_batch(batch, stratum=source):
+                rows.append((now, source.split(":")[0], sorted(coins), label, weight))
+                self.window.add(*rows[-1])
+            self._log_batch(source, mark, rows)
+        self.window.prune()
 
         try:
-            prices = self.get_prices_batch(tickers)
+            remaining = max(prices_timeout - (time.monotonic() - start), 0)
+            prices = prices_future.result(timeout=remaining)
+        except FetchTimeout:
+            self._save_progress()
+            return [f"Error fetching prices: timed out after {prices_timeout:g}s"]
         except Exception as e:
+            self._save_progress()
             return [f"Error fetching prices: {e}"]
 
-        for coin in tickers:
-            price = prices.get(coin, 0.0)
+        quoted = [c for c in tickers if prices.get(c) is not None]
+        sentiment = {c: self.window.ratios(c) for c in quoted}
+        rules_used = [w for p in profiles for w in p["thresholds"].get("windows", {})]
+        windows = list(dict.fromkeys([*cfg.get("history", {}).get("windows", DEFAULT_WINDOWS), *rules_used]))
+        with self.metrics.span("history", coins=len(quoted)):
+            now = time.time()
+            self.history.append(now, {c: (prices[c], *sentiment[c][:2]) for c in quoted})
+            stats = self.history.window_stats(quoted, windows, now)
+
+        # logged once per coin, against the shared last price, whichever profiles watch it
+        logged_pct = {}
+        for coin in quoted:
             prev = self.state.get(coin, {}).get("last_price")
-            pct = ((price - prev) / prev * 100) if prev else None
-
-            aliases = ALIASES.get(coin, [coin])
-            coin_texts = [t for t in all_texts if any(a.lower() in t.lower() for a in aliases)]
-            count_msgs = len(coin_texts)
-
-            if coin_texts:
-                results  = self.analyze_sentiment(coin_texts)
-                total = len(results)
-                pos_list = [r for r in results if r["label"] == "POSITIVE"]
-                neg_list = [r for r in results if r["label"] == "NEGATIVE"]
-                pct_pos  = len(pos_list)/total if total else 0.0
-                pct_neg  = len(neg_list)/total if total else 0.0
-            else:
-                pct_pos = pct_neg = 0.0
-
-            line = f"{coin.upper()}: ${price:.2f}"
-            if pct is not None:
-                line += f" ({pct:+.2f}%)"
-            line += f" | POS {pct_pos:.0%} | NEG {pct_neg:.0%}"
-            messages.append(line)
-
-            cache = self._load_json(CACHE_FILE)
-            obj = next((c for c in cache if c["id"] == coin), {})
-            img = obj.get("image", "")
-
-            alert_flag = 0
-            if pct is not None and abs(pct) >= self.th_pct and pct_neg >= self.th_sent:
-                self.send_discord_embed(coin, price, pct, pct_pos, pct_neg, count_msgs, img)
-                messages.append(f"[ALERT SENT] {coin.upper()}")
-                alert_flag = 1
-
-            self.state[coin] = {"last_price": price}
-
-            with LOG_FILE.open("a", encoding="utf-8") as lf:
-                lf.write(
-                    f"{datetime.utcnow().isoformat()}  "
-                    f"{coin}  "
-                    f"{price:.2f}  "
-                    f"{pct or 0:+.2f}%  "
-                    f"{pct_pos:.0%}  "
-                    f"{pct_neg:.0%}  "
-                    f"{alert_flag}\n"
+            logged_pct[coin] = ((prices[coin] - prev) / prev * 100) if prev else None
+
+        alerted = set()
+        updates = []
+        for profile in profiles:
+            th = profile["thresholds"]
+            rules = th.get("windows", {})
+            state = self._profile_state(profile["name"])
+            tag = f"[{profile['name']}] " if profile["name"] else ""
+            for coin in profile["tickers"]:
+                price = prices.get(coin)
+                if price is None:
+                    # no quote this run: keep last_price so the next change is measured correctly
+                    messages.append(f"{tag}{coin.upper()}: price unavailable")
+                    continue
+                prev = state.get(coin, {}).get("last_price")
+                pct = ((price - prev) / prev * 100) if prev else None
+
+                pct_pos, pct_neg, count_msgs = sentiment[coin]
+
+                line = f"{tag}{coin.upper()}: ${price:.2f}"
+                if pct is not None:
+                    line += f" ({pct:+.2f}%)"
+                for w in windows:
+                    if (ws := stats[w].get(coin)) and ws["pct"] is not None:
+                        line += f" [{w} {ws['pct']:+.2f}%]"
+                if self.sampler is not None and (n_eff := self.window.effective_n(coin)):
+                    # over the same weighted window entries the shares are computed from
+                    err_pos = wilson_halfwidth(pct_pos, n_eff, self.sampler.z)
+                    err_neg = wilson_halfwidth(pct_neg, n_eff, self.sampler.z)
+                    line += f" | POS {pct_pos:.0%} ±{err_pos:.0%} | NEG {pct_neg:.0%} ±{err_neg:.0%}"
+                else:
+                    line += f" | POS {pct_pos:.0%} | NEG {pct_neg:.0%}"
+                messages.append(line)
+
+                hits = window_rule_hits(rules, stats, coin, pct_neg)
+                coin_th = th.get("coins", {}).get(coin, {})
+                base_hit = (
+                    pct is not None
+                    and abs(pct) >= coin_th.get("pct", th.get("pct", self.th_pct))
+                    and pct_neg >= coin_th.get("sentiment", th.get("sentiment", self.th_sent))
                 )
-
-        self._save_json(self.state, self.state_path)
+                if base_hit or hits:
+                    shown = pct if base_hit else (stats[hits[0]][coin]["pct"] or 0.0)
+                    img = self.coins.get(coin, {}).get("image", "")
+                    self.send_discord_embed(
+                        coin, price, shown, pct_pos, pct_neg, count_msgs, img, profile["webhook"]
+                    )
+                    messages.append(f"{tag}[ALERT QUEUED] {coin.upper()}" + (f" ({', '.join(hits)})" if hits else ""))
+                    self.metrics.count("alerts_sent")
+                    alerted.add(coin)
+
+                state[coin] = {"last_price": price}
+                key = (coin,) if profile["name"] is None else ("_profiles", profile["name"], coin)
+                updates.append((key, state[coin]))
+
+        log_rows = []
+        ts = datetime.utcnow().isoformat()
+        for coin in quoted:
+            pct_pos, pct_neg, _ = sentiment[coin]
+            log_rows.append((ts, coin, prices[coin], logged_pct[coin], pct_pos, pct_neg, int(coin in alerted)))
+            self.state[coin] = {"last_price": prices[coin]}
+            updates.append(((coin,), self.state[coin]))
+        # alerts are already queued; losing these to a crash would re-send them next run
+        self.store.record(updates)
+
+        with self.metrics.span("file_io"):
+            self.logstore.append_many(log_rows)
+        self._save_progress()
+
+        messages.append(f"New texts: {fetched} | window: {len(self.window)}")
+        cache_total = self.sentiment_cache.hits + self.sentiment_cache.misses
+        messages.append(
+            f"Sentiment cache: {self.sentiment_cache.hits}/{cache_total} hits "
+            f"({self.sentiment_cache.hit_rate():.0%})"
+        )
         return messages
@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LOG_DB = BASE_DIR / "logs.db"
+LEGACY_LOG = BASE_DIR / "logs.txt"
+
+COLUMNS = ("ts", "coin", "price", "pct", "pos", "neg", "alert")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id    INTEGER PRIMARY KEY,
+    ts    TEXT NOT NULL,
+    coin  TEXT NOT NULL,
+    price REAL,
+    pct   REAL,
+    pos   REAL,
+    neg   REAL,
+    alert INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS checks_ts ON checks (ts);
+CREATE INDEX IF NOT EXISTS checks_coin_ts ON checks (coin, ts);
+"""
+
+
+def parse_legacy_line(line):
+    parts = [p.strip() for p in line.split("  ") if p.strip()]
+    if len(parts) != 7:
+        return None
+    ts, coin, price, pct, pos, neg, alert = parts
+    try:
+        return (
+            ts, coin, float(price), float(pct.rstrip("%")),
+            float(pos.rstrip("%")) / 100, float(neg.rstrip("%")) / 100, int(alert)
+        )
+    except ValueError:
+        return None
+
+
+class LogStore:
+    def __init__(self, path: Path = LOG_DB, legacy: Path = None):
+        self.path = path
+        self._lock = threading.Lock()
+        # the GUI worker and the daemon's HTTP thread both write, guarded by _lock
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if legacy is not None and legacy.exists():
+            self._import_legacy(legacy)
+
+    def _import_legacy(self, legacy: Path):
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM checks LIMIT 1").fetchone():
+                return
+            with legacy.open(encoding="utf-8") as f:
+                rows = [r for r in map(parse_legacy_line, f) if r]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO checks (ts, coin, price, pct, pos, neg, alert) VALUES (?,?,?,?,?,?,?)",
+                    rows
+                )
+
+    def append_many(self, rows):
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO checks (ts, coin, price, pct, pos, neg, alert) VALUES (?,?,?,?,?,?,?)",
+                rows
+            )
+
+    def _where(self, coin=None, since=None, until=None):
+        clauses, args = [], []
+        if coin:
+            clauses.append("coin = ?")
+            args.append(coin)
+        if since:
+            clauses.append("ts >= ?")
+            args.append(since)
+        if until:
+            clauses.append("ts < ?")
+            args.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def count(self, coin=None, since=None, until=None):
+        where, args = self._where(coin, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM checks{where}", args).fetchone()[0]
+
+    def query(self, coin=None, since=None, until=None, order_by="ts", descending=True,
+              offset=0, limit=200):
+        if order_by not in COLUMNS:
+            raise ValueError(f"Unknown log column: {order_by}")
+        where, args = self._where(coin, since, until)
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            f"SELECT {', '.join(COLUMNS)} FROM checks{where} "
+            f"ORDER BY {order_by} {direction}, id {direction} LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            return self._conn.execute(sql, args + [limit, offset]).fetchall()
+
+    def latest(self, coins):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM checks WHERE coin = ? ORDER BY ts DESC LIMIT 1"
+        out = {}
+        with self._lock:
+            # one indexed lookup per coin on (coin, ts) instead of scanning the whole table
+            for coin in coins:
+                row = self._conn.execute(sql, (coin,)).fetchone()
+                if row:
+                    out[coin] = row
+        return out
+
+    def coins(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT coin FROM checks ORDER BY coin")]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
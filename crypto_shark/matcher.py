@@ -0,0 +1,77 @@
+from collections import deque
+
+
+MIN_ALIAS_LEN = 2
+
+
+def build_aliases(tickers, coins=None, extra=None):
+    by_id = {c.get("id"): c for c in (coins or []) if c.get("id")}
+    aliases = {}
+    for cid in tickers:
+        names = {cid.lower(), cid.replace("-", " ").lower()}
+        names.update(a.lower() for a in (extra or {}).get(cid, []))
+        obj = by_id.get(cid, {})
+        for key in ("symbol", "name"):
+            if val := obj.get(key):
+                names.add(val.lower())
+        aliases[cid] = sorted(n for n in names if len(n) >= MIN_ALIAS_LEN)
+    return aliases
+
+
+class AliasMatcher:
+    def __init__(self, aliases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for coin, names in aliases.items():
+            for name in names:
+                self._add(name.lower(), coin)
+        self._link()
+
+    def _add(self, word, coin):
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(word), coin))
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, text):
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        end = len(text)
+        found = set()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            after_ok = i + 1 == end or not text[i + 1].isalnum()
+            if not after_ok:
+                continue
+            for length, coin in out[node]:
+                start = i - length + 1
+                if coin not in found and (start == 0 or not text[start - 1].isalnum()):
+                    found.add(coin)
+        return found
@@ -0,0 +1,176 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+
+PREFIX = "crypto_shark"
+
+COUNTERS = (
+    "texts_fetched", "duplicates_collapsed", "texts_sampled_out", "texts_classified", "cache_hits",
+    "alerts_sent", "http_retries"
+)
+
+
+class CycleMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start_cycle()
+
+    def start_cycle(self):
+        with self._lock:
+            self.started = time.time()
+            self._t0 = time.perf_counter()
+            self.duration = None
+            self.spans = []
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.ok = True
+
+    @contextmanager
+    def span(self, stage, **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.spans.append({
+                    "stage": stage,
+                    "start": round(start - self._t0, 6),
+                    "seconds": round(elapsed, 6),
+                    "thread": threading.current_thread().name,
+                    **attrs,
+                })
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish_cycle(self, ok=True):
+        self.duration = time.perf_counter() - self._t0
+        self.ok = ok
+
+    def stage_totals(self):
+        totals = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+        with self._lock:
+            for s in self.spans:
+                totals[s["stage"]]["seconds"] += s["seconds"]
+                totals[s["stage"]]["calls"] += 1
+        return dict(totals)
+
+    def to_prometheus(self):
+        lines = [
+            f"# HELP {PREFIX}_cycle_seconds Wall time of the last check cycle.",
+            f"# TYPE {PREFIX}_cycle_seconds gauge",
+            f"{PREFIX}_cycle_seconds {self.duration or 0:.6f}",
+            f"# HELP {PREFIX}_cycle_success Whether the last check cycle completed.",
+            f"# TYPE {PREFIX}_cycle_success gauge",
+            f"{PREFIX}_cycle_success {int(self.ok)}",
+            f"# HELP {PREFIX}_last_cycle_timestamp_seconds Unix time the last check cycle started.",
+            f"# TYPE {PREFIX}_last_cycle_timestamp_seconds gauge",
+            f"{PREFIX}_last_cycle_timestamp_seconds {self.started:.0f}",
+            f"# HELP {PREFIX}_stage_seconds Time spent per stage in the last cycle (summed over calls).",
+            f"# TYPE {PREFIX}_stage_seconds gauge",
+        ]
+        totals = self.stage_totals()
+        for stage, t in sorted(totals.items()):
+            lines.append(f'{PREFIX}_stage_seconds{{stage="{stage}"}} {t["seconds"]:.6f}')
+        lines += [
+            f"# HELP {PREFIX}_stage_calls Calls per stage in the last cycle.",
+            f"# TYPE {PREFIX}_stage_calls gauge",
+        ]
+        for stage, t in sorted(totals.items()):
+            lines.append(f'{PREFIX}_stage_calls{{stage="{stage}"}} {t["calls"]}')
+        for name, value in sorted(self.counters.items()):
+            lines += [
+                f"# HELP {PREFIX}_{name} {name.replace('_', ' ').capitalize()} in the last cycle.",
+                f"# TYPE {PREFIX}_{name} gauge",
+                f"{PREFIX}_{name} {value}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path):
+        # node-exporter may read at any moment, so never expose a half-written file
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def append_trace(self, path: Path):
+        with self._lock:
+            record = {
+                "ts": self.started,
+                "cycle_seconds": round(self.duration or 0, 6),
+                "ok": self.ok,
+                "counters": dict(self.counters),
+                "spans": list(self.spans),
+            }
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+class StartupProfile:
+    def __init__(self, name):
+        self.name = name
+        self._t0 = time.perf_counter()
+        self.steps = []
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def mark(self, name):
+        self.steps.append((name, time.perf_counter() - self._t0))
+
+    def report(self, module=None, top=12):
+        lines = []
+        if module:
+            imports = import_breakdown(module)
+            total = sum(imports.values())
+            lines.append(f"import {module}: {total:.3f}s")
+            for name, seconds in sorted(imports.items(), key=lambda kv: -kv[1])[:top]:
+                lines.append(f"  {name:<32} {seconds:8.3f}s")
+        lines.append(f"{self.name} init:")
+        for name, seconds in self.steps:
+            lines.append(f"  {name:<32} {seconds:8.3f}s")
+        return "\n".join(lines)
+
+
+def _importtime(code):
+    root = Path(__file__).resolve().parent.parent
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(root), os.getenv("PYTHONPATH")]))}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        own, _, name = line.split("|")
+        own = own.rsplit(":", 1)[1].strip()
+        if own.isdigit():
+            rows.append((name.strip(), int(own) / 1e6))
+    return rows
+
+
+def import_breakdown(module):
+    # measured in fresh interpreters, so modules this process already loaded are counted too;
+    # whatever the bare interpreter imports at startup is left out
+    baseline = {name for name, _ in _importtime("pass")}
+    totals = defaultdict(float)
+    for name, seconds in _importtime(f"import {module}"):
+        if name in baseline:
+            continue
+        # self time summed per package, so each package is charged for its own modules only
+        parts = name.split(".")
+        key = ".".join(parts[:2]) if parts[0] == PREFIX and len(parts) > 1 else parts[0]
+        totals[key] += seconds
+    return dict(totals)
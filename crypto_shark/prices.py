@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crypto_shark.coins import COINGECKO_API
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PRICE_CACHE_FILE = BASE_DIR / "prices_cache.json"
+
+CHUNK_SIZE = 100
+WORKERS = 4
+RATE_PER_MINUTE = 30
+CACHE_TTL = 30
+MAX_RETRIES = 3
+
+
+class PriceError(RuntimeError):
+    pass
+
+
+def retry_after_seconds(value, default=60.0):
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute=RATE_PER_MINUTE, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, rate_per_minute // 6)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class PriceCache:
+    def __init__(self, path: Path = PRICE_CACHE_FILE, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def get_many(self, ids):
+        if self.ttl <= 0:
+            return {}
+        data = self._read()
+        now = time.time()
+        return {c: data[c][0] for c in ids if c in data and now - data[c][1] < self.ttl}
+
+    def put_many(self, prices):
+        if self.ttl <= 0 or not prices:
+            return
+        with self._lock:
+            data = self._read()
+            now = time.time()
+            data = {c: v for c, v in data.items() if now - v[1] < self.ttl}
+            data.update({c: [p, now] for c, p in prices.items()})
+            # the GUI and the checker read this file concurrently
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+class PriceClient:
+    def __init__(self, cache: PriceCache = None, chunk_size=CHUNK_SIZE, workers=WORKERS,
+                 rate_per_minute=RATE_PER_MINUTE, max_retries=MAX_RETRIES, on_retry=None):
+        self.cache = cache or PriceCache()
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.on_retry = on_retry or (lambda: None)
+        self.bucket = TokenBucket(rate_per_minute)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crypto-prices")
+
+    @classmethod
+    def from_config(cls, cfg, cache_path: Path = PRICE_CACHE_FILE, on_retry=None):
+        return cls(
+            cache=PriceCache(cache_path, cfg.get("cache_ttl", CACHE_TTL)),
+            chunk_size=cfg.get("chunk_size", CHUNK_SIZE),
+            workers=cfg.get("workers", WORKERS),
+            rate_per_minute=cfg.get("rate_per_minute", RATE_PER_MINUTE),
+            max_retries=cfg.get("max_retries", MAX_RETRIES),
+            on_retry=on_retry
+        )
+
+    def _fetch_chunk(self, ids):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                resp = self.session.get(
+                    f"{COINGECKO_API}/simple/price",
+                    params={"ids": ",".join(ids), "vs_currencies": "usd"},
+                    timeout=10
+                )
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise PriceError(f"CoinGecko request failed: {e}") from e
+                self.on_retry()
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if resp.status_code == 429 or resp.status_code >= 500:
+                if attempt == self.max_retries:
+                    raise PriceError(f"CoinGecko returned HTTP {resp.status_code}")
+                self.on_retry()
+                if resp.status_code == 429:
+                    # every chunk shares the bucket, so one 429 holds back all of them
+                    self.bucket.pause(retry_after_seconds(resp.headers.get("Retry-After")))
+                else:
+                    time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if not resp.ok:
+                raise PriceError(f"CoinGecko returned HTTP {resp.status_code}")
+            data = resp.json()
+            return {c: data[c]["usd"] for c in ids if "usd" in data.get(c, {})}
+        raise PriceError("CoinGecko retries exhausted")
+
+    def get(self, coins):
+        coins = list(dict.fromkeys(coins))
+        prices = self.cache.get_many(coins)
+        todo = [c for c in coins if c not in prices]
+        if not todo:
+            return prices
+
+        chunks = [todo[i:i + self.chunk_size] for i in range(0, len(todo), self.chunk_size)]
+        fetched, errors = {}, []
+        for fut in [self._executor.submit(self._fetch_chunk, c) for c in chunks]:
+            try:
+                fetched.update(fut.result())
+            except PriceError as e:
+                errors.append(e)
+        if errors and len(errors) == len(chunks):
+            raise errors[0]
+        self.cache.put_many(fetched)
+        prices.update(fetched)
+        return prices
@@ -0,0 +1,94 @@
+import math
+import random
+from statistics import NormalDist
+
+
+WIDTH = 0.1
+CONFIDENCE = 0.95
+MIN_TEXTS = 20
+MAX_TEXTS = 200
+STEP = 32
+
+
+def wilson_halfwidth(p, n, z, fpc=1.0):
+    # unlike the Wald p(1-p)/n, this stays wide when a small sample is unanimous
+    if n <= 0:
+        return 1.0
+    z2 = z * z
+    return z / (1 + z2 / n) * math.sqrt(p * (1 - p) / n * fpc + z2 / (4 * n * n))
+
+
+class AdaptiveSampler:
+    def __init__(self, width=WIDTH, confidence=CONFIDENCE, min_texts=MIN_TEXTS,
+                 max_texts=MAX_TEXTS, step=STEP, seed=None):
+        if not 0 < confidence < 1:
+            raise ValueError("sampling.confidence must be between 0 and 1")
+        self.width = width
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.min_texts = min_texts
+        self.max_texts = max_texts
+        self.step = step
+        self._rng = random.Random(seed)
+        # (coin, stratum) -> [population, sampled, positive, negative]
+        self.stats = {}
+
+    @classmethod
+    def from_config(cls, cfg):
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            width=cfg.get("width", WIDTH),
+            confidence=cfg.get("confidence", CONFIDENCE),
+            min_texts=cfg.get("min_texts", MIN_TEXTS),
+            max_texts=cfg.get("max_texts", MAX_TEXTS),
+            step=cfg.get("step", STEP)
+        )
+
+    def reset(self):
+        self.stats = {}
+
+    def _open(self, s):
+        population, n, pos, neg = s
+        if n >= population or n >= self.max_texts:
+            return False
+        if n < self.min_texts:
+            return True
+        fpc = 1 - n / population
+        half = max(wilson_halfwidth(pos / n, n, self.z, fpc), wilson_halfwidth(neg / n, n, self.z, fpc))
+        return 2 * half > self.width
+
+    def sample(self, stratum, coin_sets, label):
+        # label(indices) classifies those items; returns the (index, label) pairs it asked for
+        # and, per coin, how many items of this stratum each sampled one stands for
+        for coins in coin_sets:
+            for c in coins:
+                self.stats.setdefault((c, stratum), [0, 0, 0, 0])[0] += 1
+
+        order = list(range(len(coin_sets)))
+        self._rng.shuffle(order)
+        picked = []
+        pos = 0
+        while pos < len(order):
+            chunk = []
+            while pos < len(order) and len(chunk) < self.step:
+                i = order[pos]
+                pos += 1
+                # items whose coins have all converged are never classified
+                if any(self._open(self.stats[(c, stratum)]) for c in coin_sets[i]):
+                    chunk.append(i)
+            if not chunk:
+                break
+            for i, lab in zip(chunk, label(chunk)):
+                picked.append((i, lab))
+                for c in coin_sets[i]:
+                    s = self.stats[(c, stratum)]
+                    s[1] += 1
+                    s[2] += lab == "POSITIVE"
+                    s[3] += lab == "NEGATIVE"
+
+        scale = {}
+        for coins in coin_sets:
+            for c in coins:
+                population, n = self.stats[(c, stratum)][:2]
+                scale[c] = population / n if n else 0.0
+        return picked, scale
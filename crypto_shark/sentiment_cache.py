@@ -0,0 +1,87 @@
+import hashlib
+import json
+from collections import OrderedDict
+from pathlib import Path
+
+from crypto_shark.statestore import file_stamp, write_atomic
+
+
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", "replace")).hexdigest()
+
+
+class SentimentCache:
+    def __init__(self, path: Path, max_entries: int = DEFAULT_MAX_ENTRIES, model: str = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.model = model
+        self._entries = OrderedDict()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._stamp = None
+        self._load()
+
+    def _load(self):
+        self._stamp = file_stamp(self.path)
+        if self._stamp is None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, list):
+            # saved before entries were tagged with the model that produced them
+            data = {"model": None, "rows": data}
+        if data.get("model") != self.model:
+            # labels from another backend or model would be served as if they were ours
+            self._dirty = True
+            return
+        for key, label, score in data["rows"][-self.max_entries:]:
+            self._entries[key] = {"label": label, "score": score}
+
+    def reload(self):
+        if file_stamp(self.path) == self._stamp:
+            return
+        self._entries.clear()
+        self._dirty = False
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        res = self._entries.get(key)
+        if res is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._dirty = True
+        self.hits += 1
+        return res
+
+    def put(self, key, result):
+        self._entries[key] = {"label": result["label"], "score": float(result["score"])}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset_stats(self):
+        self.hits = self.misses = 0
+
+    def save(self):
+        if not self._dirty:
+            return
+        rows = [[k, v["label"], round(v["score"], 4)] for k, v in self._entries.items()]
+        data = {"model": self.model, "rows": rows}
+        write_atomic(self.path, json.dumps(data, separators=(",", ":")))
+        self._stamp = file_stamp(self.path)
+        self._dirty = False
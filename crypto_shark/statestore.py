@@ -0,0 +1,167 @@
+import contextlib
+import json
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+WAL_SUFFIX = ".wal"
+
+_COMPACT = (",", ":")
+_local = threading.local()
+
+
+def lock_path(path: Path):
+    return path.with_name(f".{path.name}.lock")
+
+
+@contextlib.contextmanager
+def locked(path: Path, shared=False):
+    # advisory, on a sidecar file: the data file itself is replaced on every write
+    held = _local.__dict__.setdefault("held", {})
+    key = str(lock_path(path).resolve())
+    if key in held:
+        # already held by this thread (e.g. a save inside a locked cycle)
+        yield
+        return
+    f = open(lock_path(path), "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            # msvcrt has no shared locks; readers simply take the exclusive one
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        held[key] = True
+        try:
+            yield
+        finally:
+            del held[key]
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        f.close()
+
+
+def try_hold(path: Path):
+    # non-blocking and long-lived: held until the returned file is closed, and released
+    # by the OS if the holder dies. None means another live process holds it.
+    f = open(lock_path(path), "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def file_stamp(path: Path):
+    # cheap change check for files another process may have rewritten since we read them
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def write_atomic(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    # readers see either the old file or the new one, never a half-written one
+    os.replace(tmp, path)
+
+
+def read_json(path: Path):
+    with locked(path, shared=True):
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_json(path: Path, data, indent=None):
+    text = json.dumps(data, indent=indent, separators=None if indent else _COMPACT)
+    with locked(path):
+        write_atomic(path, text)
+
+
+def update_json(path: Path, fn, indent=2):
+    # read-modify-write under one lock, so the GUI and a running check never drop each other's edits
+    with locked(path):
+        data = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        fn(data)
+        write_json(path, data, indent=indent)
+    return data
+
+
+class StateStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self.wal_path = path.with_name(path.name + WAL_SUFFIX)
+
+    def locked(self):
+        return locked(self.path)
+
+    def load(self):
+        with locked(self.path):
+            try:
+                state = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+            except ValueError:
+                # written by an older version in place and cut short; the log below still applies
+                state = {}
+            for key, value in self._replay():
+                self._apply(state, key, value)
+        return state
+
+    def _replay(self):
+        if not self.wal_path.exists():
+            return
+        with self.wal_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    key, value = json.loads(line)
+                except ValueError:
+                    # torn by a crash mid-append; every batch starts on a fresh line, so later ones still apply
+                    continue
+                yield key, value
+
+    @staticmethod
+    def _apply(state, key, value):
+        *parents, leaf = key
+        for k in parents:
+            state = state.setdefault(k, {})
+        state[leaf] = value
+
+    def record(self, updates):
+        # (key path, value) pairs, fsynced once per call rather than once per coin
+        if not updates:
+            return
+        lines = "\n" + "".join(json.dumps([list(k), v], separators=_COMPACT) + "\n" for k, v in updates)
+        with locked(self.path):
+            with self.wal_path.open("a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def commit(self, state):
+        with locked(self.path):
+            write_atomic(self.path, json.dumps(state, separators=_COMPACT))
+            # the snapshot now holds everything the log did
+            self.wal_path.unlink(missing_ok=True)
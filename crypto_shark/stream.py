@@ -0,0 +1,289 @@
+import argparse
+import queue
+import threading
+import time
+from datetime import datetime
+
+from crypto_shark.history import window_rule_hits
+from crypto_shark.logic import CryptoWatcherLogic
+from crypto_shark.window import DEFAULT_WINDOW_MINUTES
+
+
+BATCH_SIZE = 32
+MAX_LATENCY = 2.0
+QUEUE_SIZE = 5000
+PRICE_INTERVAL = 60.0
+SAVE_INTERVAL = 60.0
+COOLDOWN = 900.0
+MAX_BACKOFF = 300
+
+
+class StreamWatcher:
+    def __init__(self, logic: CryptoWatcherLogic, cfg=None):
+        self.logic = logic
+        self.cfg = cfg if cfg is not None else logic._load_json(logic.config_path)
+        scfg = self.cfg.get("stream", {})
+        self.batch_size = scfg.get("batch_size", BATCH_SIZE)
+        self.max_latency = scfg.get("max_latency", MAX_LATENCY)
+        self.price_interval = scfg.get("price_interval", PRICE_INTERVAL)
+        self.save_interval = scfg.get("save_interval", SAVE_INTERVAL)
+        self.cooldown = scfg.get("cooldown", COOLDOWN)
+        self.use_twitter = scfg.get("twitter", False)
+
+        self.tickers = self.cfg.get("tickers", [])
+        th = self.cfg.get("thresholds", {})
+        self.th_pct = th.get("pct", logic.th_pct)
+        self.th_sent = th.get("sentiment", logic.th_sent)
+        self.rules = th.get("windows", {})
+        self.overrides = th.get("coins", {})
+        # price change is measured over the same span the sentiment window covers
+        self.span = f"{self.cfg.get('window', {}).get('minutes', DEFAULT_WINDOW_MINUTES)}m"
+        logic.window.span = self.cfg.get("window", {}).get("minutes", DEFAULT_WINDOW_MINUTES) * 60
+
+        logic.coins.configure(self.cfg.get("coins", {})).load()
+        self.matcher = logic._get_matcher(self.tickers)
+
+        # bounded: a comment flood drops the oldest unclassified texts instead of growing memory
+        self.queue = queue.Queue(maxsize=scfg.get("queue_size", QUEUE_SIZE))
+        self.dropped = 0
+        self.received = 0
+        self.prices = {}
+        self.last_alert = {}
+        self._alerted = set()
+        self._lock = threading.Lock()
+        self._alert_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._twitter = None
+        self._lease = None
+
+    def _offer(self, source, text):
+        coins = self.matcher.match(text)
+        if not coins:
+            return
+        self.received += 1
+        item = (time.time(), source, text[:2000], coins)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _reddit_loop(self):
+        subs = "+".join(self.cfg.get("subreddits") or ["CryptoCurrency"])
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                stream = self.logic._thread_reddit().subreddit(subs).stream.comments(
+                    skip_existing=True, pause_after=-1
+                )
+                for c in stream:
+                    if self._stop.is_set():
+                        return
+                    if c is None:
+                        # pause_after yields None between polls so stop() is noticed
+                        continue
+                    self._offer("reddit", c.body)
+                    backoff = 1
+            except Exception as e:
+                print(f"reddit stream error: {e} – reconnecting in {backoff}s", flush=True)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def _start_twitter(self):
+        import tweepy
+
+        bearer = self.logic.twitter.bearer_token
+        watcher = self
+
+        class _Stream(tweepy.StreamingClient):
+            def on_tweet(self, tweet):
+                if getattr(tweet, "lang", "en") == "en":
+                    watcher._offer("twitter", tweet.text)
+
+            def on_errors(self, errors):
+                print(f"twitter stream error: {errors}", flush=True)
+
+        try:
+            client = _Stream(bearer, wait_on_rate_limit=True)
+            old = client.get_rules().data or []
+            if old:
+                client.delete_rules([r.id for r in old])
+            query = " OR ".join(f"#{c}" for c in self.tickers) + " -is:retweet lang:en"
+            client.add_rules(tweepy.StreamRule(query[:512]))
+            client.filter(tweet_fields=["lang"], threaded=True)
+        except Exception as e:
+            # filtered streams need elevated API access; Reddit alone keeps running
+            print(f"Twitter stream unavailable: {e}", flush=True)
+            return None
+        return client
+
+    def _price_loop(self):
+        while not self._stop.is_set():
+            try:
+                prices = self.logic.prices.get(self.tickers)
+            except Exception as e:
+                print(f"Error fetching prices: {e}", flush=True)
+            else:
+                now = time.time()
+                with self._lock:
+                    prev = {c: self.logic.state.get(c, {}).get("last_price") for c in prices}
+                    self.prices.update(prices)
+                    self.logic.history.append(now, {
+                        c: (p, *self.logic.window.ratios(c)[:2]) for c, p in prices.items()
+                    })
+                    for c, p in prices.items():
+                        self.logic.state[c] = {"last_price": p}
+                self._evaluate(prices)
+                self._log(prices, prev)
+            self._stop.wait(self.price_interval)
+
+    def _log(self, prices, prev):
+        # one row per coin and price poll, shaped like a cycle's rows, so the backtest and the
+        # GUI read a stream's log the same way; alerts since the last poll are flagged on it
+        with self._alert_lock:
+            alerted, self._alerted = self._alerted, set()
+        with self._lock:
+            sentiment = {c: self.logic.window.ratios(c) for c in prices}
+        ts = datetime.utcnow().isoformat()
+        rows = []
+        for coin, price in prices.items():
+            pct = ((price - prev[coin]) / prev[coin] * 100) if prev[coin] else None
+            pct_pos, pct_neg, _ = sentiment[coin]
+            rows.append((ts, coin, price, pct, pct_pos, pct_neg, int(coin in alerted)))
+        self.logic.logstore.append_many(rows)
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.batch_size:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=left))
+            except queue.Empty:
+                break
+        return batch
+
+    def _classify(self, batch):
+        labeled = self.logic.label_batch([(text, coins) for _, _, text, coins in batch])
+        touched = set()
+        with self._lock:
+            for i, coins, label, weight in labeled:
+                ts, source, _, _ = batch[i]
+                self.logic.window.add(ts, source, coins, label, weight)
+                touched.update(coins)
+            self.logic.window.prune()
+        return touched
+
+    def _evaluate(self, coins):
+        now = time.time()
+        windows = list(dict.fromkeys([self.span, *self.rules]))
+        with self._lock:
+            quoted = [c for c in coins if c in self.prices]
+            stats = self.logic.history.window_stats(quoted, windows, now)
+            sentiment = {c: self.logic.window.ratios(c) for c in quoted}
+
+        with self._alert_lock:
+            for coin in quoted:
+                if now - self.last_alert.get(coin, 0) < self.cooldown:
+                    continue
+                pct_pos, pct_neg, count_msgs = sentiment[coin]
+                pct = (stats[self.span].get(coin) or {}).get("pct")
+                hits = window_rule_hits(self.rules, stats, coin, pct_neg)
+                coin_th = self.overrides.get(coin, {})
+                base_hit = (
+                    pct is not None
+                    and abs(pct) >= coin_th.get("pct", self.th_pct)
+                    and pct_neg >= coin_th.get("sentiment", self.th_sent)
+                )
+                if not (base_hit or hits):
+                    continue
+                price = self.prices[coin]
+                shown = pct if base_hit else (stats[hits[0]][coin]["pct"] or 0.0)
+                img = self.logic.coins.get(coin, {}).get("image", "")
+                self.logic.send_discord_embed(coin, price, shown, pct_pos, pct_neg, count_msgs, img)
+                self.last_alert[coin] = now
+                self._alerted.add(coin)
+                print(f"[ALERT QUEUED] {coin.upper()} ({shown:+.2f}% over {self.span}, NEG {pct_neg:.0%})", flush=True)
+
+    def _save(self):
+        with self._lock:
+            self.logic._save_progress()
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._reddit_loop, name="stream-reddit", daemon=True),
+            threading.Thread(target=self._price_loop, name="stream-prices", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        if self.use_twitter:
+            self._twitter = self._start_twitter()
+
+    def stop(self):
+        self._stop.set()
+        if self._twitter is not None:
+            self._twitter.disconnect()
+
+    def run(self):
+        # held until the final save; checks from cron, the daemon and the GUI stand down meanwhile
+        self._lease = self.logic.hold_data_files()
+        self.logic.load_pipeline()
+        self.start()
+        print(f"Streaming {len(self.tickers)} tickers "
+              f"(batch {self.batch_size}, max latency {self.max_latency:g}s)", flush=True)
+        last_save = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                batch = self._next_batch()
+                if batch:
+                    touched = self._classify(batch)
+                    # evaluated as soon as the window moves instead of waiting for a cycle
+                    self._evaluate(touched)
+                if time.monotonic() - last_save >= self.save_interval:
+                    self._save()
+                    if self.dropped:
+                        print(f"Backpressure: dropped {self.dropped} of {self.received} texts", flush=True)
+                    last_save = time.monotonic()
+        finally:
+            self.stop()
+            self._save()
+            self._lease.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crypto_shark.stream")
+    parser.add_argument("--batch-size", type=int, help="texts per sentiment batch")
+    parser.add_argument("--max-latency", type=float, help="seconds a text may wait for its batch")
+    parser.add_argument("--twitter", action="store_true", help="also consume the Twitter filtered stream")
+    args = parser.parse_args(argv)
+
+    logic = CryptoWatcherLogic()
+    watcher = StreamWatcher(logic)
+    if args.batch_size:
+        watcher.batch_size = args.batch_size
+    if args.max_latency is not None:
+        watcher.max_latency = args.max_latency
+    watcher.use_twitter = watcher.use_twitter or args.twitter
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f"Error: {e}", flush=True)
+    finally:
+        logic.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+from crypto_shark.statestore import file_stamp, write_atomic
+
+
+DEFAULT_WINDOW_MINUTES = 60
+
+
+class SentimentWindow:
+    def __init__(self, path: Path = None, span: float = DEFAULT_WINDOW_MINUTES * 60):
+        self.path = path
+        self.span = span
+        self._entries = deque()
+        self._counts = {}
+        # newest logged batch (see CryptoWatcherLogic._apply_pending) already in the entries
+        self.seq = 0
+        self._stamp = None
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        self._stamp = file_stamp(self.path)
+        if self._stamp is None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, list):
+            data = {"seq": 0, "rows": data}
+        self.seq = data.get("seq", 0)
+        rows = data["rows"]
+        # rows saved before dedup weights existed have no weight column
+        for ts, source, coins, label, *weight in rows:
+            self.add(ts, source, coins, label, *weight)
+        self.prune()
+
+    def reload(self):
+        # another process may have saved since this one did; its file wins
+        if self.path is None or file_stamp(self.path) == self._stamp:
+            return
+        self._entries.clear()
+        self._counts.clear()
+        self.seq = 0
+        self._load()
+
+    def add(self, ts, source, coins, label, weight=1.0):
+        if not coins:
+            return
+        entry = (ts, source, tuple(coins), label, weight)
+        self._entries.append(entry)
+        self._apply(entry, 1)
+
+    def _apply(self, entry, sign):
+        _, _, coins, label, weight = entry
+        for coin in coins:
+            c = self._counts.setdefault(coin, {"POSITIVE": 0.0, "NEGATIVE": 0.0, "total": 0.0, "sq": 0.0})
+            c["total"] += sign * weight
+            c["sq"] += sign * weight * weight
+            if label in c:
+                c[label] += sign * weight
+
+    def prune(self, now=None):
+        cutoff = (now or time.time()) - self.span
+        # entries are appended in arrival order, so the oldest are always on the left
+        while self._entries and self._entries[0][0] < cutoff:
+            self._apply(self._entries.popleft(), -1)
+
+    def counts(self, coin):
+        c = self._counts.get(coin)
+        if not c or c["total"] <= 0:
+            return 0.0, 0.0, 0.0
+        return c["POSITIVE"], c["NEGATIVE"], c["total"]
+
+    def ratios(self, coin):
+        pos, neg, total = self.counts(coin)
+        if not total:
+            return 0.0, 0.0, 0
+        return pos / total, neg / total, round(total)
+
+    def effective_n(self, coin):
+        # Kish effective sample size: unequal weights carry less information than as many equal votes
+        c = self._counts.get(coin)
+        if not c or c["total"] <= 0 or c["sq"] <= 0:
+            return 0.0
+        return c["total"] ** 2 / c["sq"]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        if self.path is None:
+            return
+        rows = [[round(ts, 1), src, list(coins), label, weight]
+                for ts, src, coins, label, weight in self._entries]
+        write_atomic(self.path, json.dumps({"seq": self.seq, "rows": rows}, separators=(",", ":")))
+        self._stamp = file_stamp(self.path)